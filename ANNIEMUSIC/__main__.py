@@ -1,31 +1,28 @@
 import asyncio
-import importlib
+import time
+from typing import Awaitable, Callable, Dict, Tuple
 
 from pyrogram import idle
 from pytgcalls.exceptions import NoActiveGroupCall
 
 import config
-from ANNIEMUSIC import LOGGER, app, userbot
+from ANNIEMUSIC import LOGGER, app, plugins, userbot
 from ANNIEMUSIC.core.call import JARVIS
 from ANNIEMUSIC.misc import sudo
-from ANNIEMUSIC.plugins import ALL_MODULES
+from ANNIEMUSIC.mongo import spotifydb
+from ANNIEMUSIC.utils import janitor, placement
 from ANNIEMUSIC.utils.database import get_banned_users, get_gbanned
 from ANNIEMUSIC.utils.cookie_handler import fetch_and_store_cookies
+from ANNIEMUSIC.utils.media_cache import media_cache
+from ANNIEMUSIC.utils.transcode import native_cache
+from ANNIEMUSIC.utils.tuning import TRANSCODE_NATIVE
 from config import BANNED_USERS
 
 
-async def init():
-    if (
-        not config.STRING1
-        and not config.STRING2
-        and not config.STRING3
-        and not config.STRING4
-        and not config.STRING5
-    ):
-        LOGGER(__name__).error("ᴀssɪsᴛᴀɴᴛ sᴇssɪᴏɴ ɴᴏᴛ ғɪʟʟᴇᴅ, ᴘʟᴇᴀsᴇ ғɪʟʟ ᴀ ᴘʏʀᴏɢʀᴀᴍ sᴇssɪᴏɴ...")
-        exit()
+PROBE_URL = "http://docs.evostream.com/sample_content/assets/sintel1m720p.mp4"
 
-    # ✅ Try to fetch cookies at startup
+
+async def load_cookies():
     try:
         await fetch_and_store_cookies()
         LOGGER("ANNIEMUSIC").info("ʏᴏᴜᴛᴜʙᴇ ᴄᴏᴏᴋɪᴇs ʟᴏᴀᴅᴇᴅ sᴜᴄᴄᴇssғᴜʟʟʏ ✅")
@@ -33,43 +30,124 @@ async def init():
         LOGGER("ANNIEMUSIC").warning(f"⚠️ᴄᴏᴏᴋɪᴇ ᴇʀʀᴏʀ: {e}")
 
 
-    await sudo()
+async def warm_caches():
+    # On the loop: the caches are not thread-safe and nothing may use them
+    # until this stage is done.
+    cached = media_cache.rebuild()
+    LOGGER("ANNIEMUSIC").info(f"ᴍᴇᴅɪᴀ ᴄᴀᴄʜᴇ ᴡᴀʀᴍᴇᴅ ᴡɪᴛʜ {cached} ᴛʀᴀᴄᴋs")
+    if TRANSCODE_NATIVE:
+        native = native_cache.rebuild()
+        LOGGER("ANNIEMUSIC").info(f"ɴᴀᴛɪᴠᴇ ᴄᴀᴄʜᴇ ᴡᴀʀᴍᴇᴅ ᴡɪᴛʜ {native} ᴛʀᴀᴄᴋs")
+
 
+async def load_bans():
     try:
-        users = await get_gbanned()
-        for user_id in users:
-            BANNED_USERS.add(user_id)
-        users = await get_banned_users()
-        for user_id in users:
-            BANNED_USERS.add(user_id)
+        for users in await asyncio.gather(get_gbanned(), get_banned_users()):
+            for user_id in users:
+                BANNED_USERS.add(user_id)
     except:
         pass
 
-    await app.start()
-    for all_module in ALL_MODULES:
-        importlib.import_module("ANNIEMUSIC.plugins" + all_module.replace("\\", ".").replace("/", "."))
 
+async def load_plugins():
+    counts = plugins.load_plugins()
+    LOGGER("ANNIEMUSIC.plugins").info(
+        f"ᴀɴɴɪᴇ's ᴍᴏᴅᴜʟᴇs ʟᴏᴀᴅᴇᴅ... ({counts['loaded']} loaded, "
+        f"{counts['deferred']} on first use, {counts['disabled']} disabled)"
+    )
+    LOGGER("ANNIEMUSIC.plugins").info(
+        "sʟᴏᴡᴇsᴛ ɪᴍᴘᴏʀᴛs: "
+        + ", ".join(f"{name.strip('.')} {took:.2f}s" for name, took in plugins.slowest())
+    )
 
-    LOGGER("ANNIEMUSIC.plugins").info("ᴀɴɴɪᴇ's ᴍᴏᴅᴜʟᴇs ʟᴏᴀᴅᴇᴅ...")
 
-    await userbot.start()
+async def start_calls():
     await JARVIS.start()
+    await JARVIS.decorators()
+
 
+async def probe_log_call() -> bool:
+    """
+    Play a short clip in the log group's voice chat, off the startup path.
+    False when that voice chat is off; init() then shuts the bot down.
+    """
     try:
-        await JARVIS.stream_call("http://docs.evostream.com/sample_content/assets/sintel1m720p.mp4")
+        await JARVIS.stream_call(PROBE_URL)
     except NoActiveGroupCall:
         LOGGER("ANNIEMUSIC").error(
             "ᴘʟᴇᴀsᴇ ᴛᴜʀɴ ᴏɴ ᴛʜᴇ ᴠᴏɪᴄᴇ ᴄʜᴀᴛ ᴏғ ʏᴏᴜʀ ʟᴏɢ ɢʀᴏᴜᴘ/ᴄʜᴀɴɴᴇʟ.\n\nᴀɴɴɪᴇ ʙᴏᴛ sᴛᴏᴘᴘᴇᴅ..."
         )
-        exit()
+        return False
     except:
         pass
+    return True
 
-    await JARVIS.decorators()
+
+async def run_stages(stages: Dict[str, Tuple[Tuple[str, ...], Callable[[], Awaitable]]]) -> Dict[str, float]:
+    """
+    Start every stage as soon as the stages it depends on have finished and
+    return how long each one took. Stages must be listed after their deps.
+    """
+    tasks: Dict[str, asyncio.Task] = {}
+    timings: Dict[str, float] = {}
+
+    async def run(name: str, deps: Tuple[str, ...], step: Callable[[], Awaitable]):
+        if deps:
+            await asyncio.gather(*(tasks[dep] for dep in deps))
+        started = time.monotonic()
+        await step()
+        timings[name] = time.monotonic() - started
+
+    for name, (deps, step) in stages.items():
+        tasks[name] = asyncio.create_task(run(name, deps, step))
+    await asyncio.gather(*tasks.values())
+    return timings
+
+
+async def init():
+    if not config.STRING_SESSIONS:
+        LOGGER(__name__).error("ᴀssɪsᴛᴀɴᴛ sᴇssɪᴏɴ ɴᴏᴛ ғɪʟʟᴇᴅ, ᴘʟᴇᴀsᴇ ғɪʟʟ ᴀ ᴘʏʀᴏɢʀᴀᴍ sᴇssɪᴏɴ...")
+        exit()
+
+    booted = time.monotonic()
+    # Handlers only go live once sudoers, bans, cookies and the caches are in
+    # place and PyTgCalls is up.
+    timings = await run_stages(
+        {
+            "cookies": ((), load_cookies),
+            "caches": ((), warm_caches),
+            "sudo": ((), sudo),
+            "bans": ((), load_bans),
+            "indexes": ((), spotifydb.ensure_indexes),
+            "bot": ((), app.start),
+            "assistants": ((), userbot.start),
+            "calls": (("assistants",), start_calls),
+            "plugins": (("bot", "cookies", "sudo", "bans", "caches", "calls"), load_plugins),
+        }
+    )
+    janitor_task = asyncio.create_task(janitor.run())
+    rebalance_task = asyncio.create_task(placement.run())
+    probe_task = asyncio.create_task(probe_log_call())
+
+    LOGGER("ANNIEMUSIC").info(
+        "sᴛᴀʀᴛᴜᴘ "
+        + " | ".join(f"{name} {took:.2f}s" for name, took in timings.items())
+        + f" | ᴛᴏᴛᴀʟ {time.monotonic() - booted:.2f}s"
+    )
     LOGGER("ANNIEMUSIC").info(
         "\x41\x6e\x6e\x69\x65\x20\x4d\x75\x73\x69\x63\x20\x52\x6f\x62\x6f\x74\x20\x53\x74\x61\x72\x74\x65\x64\x20\x53\x75\x63\x63\x65\x73\x73\x66\x75\x6c\x6c\x79\x2e\x2e\x2e"
     )
-    await idle()
+    # Serve until a stop signal, or until the probe finds the log group's
+    # voice chat off.
+    idle_task = asyncio.create_task(idle())
+    await asyncio.wait({idle_task, probe_task}, return_when=asyncio.FIRST_COMPLETED)
+    if probe_task.done() and probe_task.result() is False:
+        idle_task.cancel()
+    else:
+        await idle_task
+    janitor_task.cancel()
+    rebalance_task.cancel()
+    probe_task.cancel()
     await app.stop()
     await userbot.stop()
     LOGGER("ANNIEMUSIC").info("sᴛᴏᴘᴘɪɴɢ ᴀɴɴɪᴇ ᴍᴜsɪᴄ ʙᴏᴛ ...")
@@ -1,7 +1,8 @@
 import asyncio
+import contextlib
 import os
 from datetime import datetime, timedelta
-from typing import Union
+from typing import Dict, Optional, Tuple, Union
 
 from ntgcalls import TelegramServerError
 from pyrogram import Client
@@ -30,14 +31,21 @@ from ANNIEMUSIC.utils.database import (
 from ANNIEMUSIC.utils.exceptions import AssistantErr
 from ANNIEMUSIC.utils.formatters import check_duration, seconds_to_min, speed_converter
 from ANNIEMUSIC.utils.inline.play import stream_markup
+from ANNIEMUSIC.utils.media_cache import media_cache
+from ANNIEMUSIC.utils import placement
+from ANNIEMUSIC.utils.stream import prefetch, progressive
 from ANNIEMUSIC.utils.stream.autoclear import auto_clean
 from ANNIEMUSIC.utils.thumbnails import get_thumb
+from ANNIEMUSIC.utils.transcode import native_path
 from ANNIEMUSIC.utils.errors import capture_internal_err, send_large_error
 
 autoend = {}
 counter = {}
+# chat_id -> (queue entry, source, stream) armed for the next transition
+_armed: Dict[int, Tuple[dict, str, MediaStream]] = {}
 
 def dynamic_media_stream(path: str, video: bool = False, ffmpeg_params: str = None) -> MediaStream:
+    path = native_path(path, video)
     return MediaStream(
         audio_path=path,
         media_path=path,
@@ -47,10 +55,75 @@ def dynamic_media_stream(path: str, video: bool = False, ffmpeg_params: str = No
         ffmpeg_parameters=ffmpeg_params,
     )
 
+def _source(chat_id: int, entry: dict) -> Optional[str]:
+    """Local path or stream URL of a queue entry that needs no more fetching."""
+    queued = str(entry.get("file", ""))
+    if "live_" in queued:
+        return None
+    if "vid_" in queued:
+        return prefetch.ready_path(chat_id, entry)
+    if "index_" in queued:
+        return entry.get("vidid")
+    return queued if os.path.exists(queued) else None
+
+
+def arm(chat_id: int) -> None:
+    """Build the MediaStream of the next queue entry ahead of StreamEnded."""
+    queue = db.get(chat_id) or []
+    if len(queue) < 2:
+        _armed.pop(chat_id, None)
+        return
+    entry = queue[1]
+    current = _armed.get(chat_id)
+    if current and current[0] is entry:
+        return
+    path = _source(chat_id, entry)
+    if not path:
+        _armed.pop(chat_id, None)
+        return
+    try:
+        stream = dynamic_media_stream(path=path, video=str(entry.get("streamtype")) == "video")
+    except Exception as e:
+        LOGGER(__name__).warning(f"Could not arm next track for {chat_id}: {e}")
+        _armed.pop(chat_id, None)
+        return
+    _armed[chat_id] = (entry, path, stream)
+
+
+def _take_armed(chat_id: int, entry: dict) -> Optional[MediaStream]:
+    armed = _armed.pop(chat_id, None)
+    if not armed or armed[0] is not entry:
+        return None
+    path = armed[1]
+    if "://" not in path and not os.path.exists(path):
+        return None
+    _hold(entry, path)
+    return armed[2]
+
+
+def _hold(entry: dict, path: str) -> None:
+    """
+    Pin the file a ``vid_`` entry resolved to for as long as the entry is in
+    the queue; auto_clean releases it. Its ``file`` is not a path, so the
+    reference put_queue takes does not cover it.
+    """
+    if "vid_" not in str(entry.get("file", "")) or entry.get("held") or "://" in path:
+        return
+    entry["held"] = os.path.abspath(path)
+    media_cache.acquire(entry["held"])
+
+
+async def _drop_notice(notice: asyncio.Task) -> None:
+    with contextlib.suppress(Exception):
+        await (await notice).delete()
+
+
 async def _clear_(chat_id: int) -> None:
+    _armed.pop(chat_id, None)
+    prefetch.cancel(chat_id)
     popped = db.pop(chat_id, None)
-    if popped:
-        await auto_clean(popped)
+    for entry in popped or []:
+        await auto_clean(entry)
     db[chat_id] = []
     await remove_active_video_chat(chat_id)
     await remove_active_chat(chat_id)
@@ -58,31 +131,15 @@ async def _clear_(chat_id: int) -> None:
 
 class Call:
     def __init__(self):
-        self.userbot1 = Client(
-            "AnnieXAssis1", config.API_ID, config.API_HASH, session_string=config.STRING1
-        ) if config.STRING1 else None
-        self.one = PyTgCalls(self.userbot1) if self.userbot1 else None
-
-        self.userbot2 = Client(
-            "AnnieXAssis2", config.API_ID, config.API_HASH, session_string=config.STRING2
-        ) if config.STRING2 else None
-        self.two = PyTgCalls(self.userbot2) if self.userbot2 else None
-
-        self.userbot3 = Client(
-            "AnnieXAssis3", config.API_ID, config.API_HASH, session_string=config.STRING3
-        ) if config.STRING3 else None
-        self.three = PyTgCalls(self.userbot3) if self.userbot3 else None
-
-        self.userbot4 = Client(
-            "AnnieXAssis4", config.API_ID, config.API_HASH, session_string=config.STRING4
-        ) if config.STRING4 else None
-        self.four = PyTgCalls(self.userbot4) if self.userbot4 else None
-
-        self.userbot5 = Client(
-            "AnnieXAssis5", config.API_ID, config.API_HASH, session_string=config.STRING5
-        ) if config.STRING5 else None
-        self.five = PyTgCalls(self.userbot5) if self.userbot5 else None
-
+        self.userbots: Dict[int, Client] = {
+            number: Client(
+                f"AnnieXAssis{number}", config.API_ID, config.API_HASH, session_string=session
+            )
+            for number, session in config.STRING_SESSIONS.items()
+        }
+        self.clients: Dict[int, PyTgCalls] = {
+            number: PyTgCalls(userbot) for number, userbot in self.userbots.items()
+        }
         self.active_calls: set[int] = set()
 
 
@@ -126,7 +183,7 @@ class Call:
         try:
             check = db.get(chat_id)
             if check:
-                check.pop(0)
+                await auto_clean(check.pop(0))
         except (IndexError, KeyError):
             pass
         await remove_active_video_chat(chat_id)
@@ -147,6 +204,10 @@ class Call:
         assistant = await group_assistant(self, chat_id)
         stream = dynamic_media_stream(path=link, video=bool(video))
         await assistant.play(chat_id, stream)
+        queue = db.get(chat_id)
+        if queue:
+            _hold(queue[0], link)
+        prefetch.refresh(chat_id)
 
     @capture_internal_err
     async def vc_users(self, chat_id: int) -> list:
@@ -235,6 +296,8 @@ class Call:
         except TelegramServerError:
             raise AssistantErr(_["call_10"])
         except Exception as e:
+            if isinstance(e, FloodWait):
+                placement.note_flood(chat_id)
             raise AssistantErr(
                 f"ᴜɴᴀʙʟᴇ ᴛᴏ ᴊᴏɪɴ ᴛʜᴇ ɢʀᴏᴜᴘ ᴄᴀʟʟ.\nRᴇᴀsᴏɴ: {e}"
             )
@@ -282,207 +345,176 @@ class Call:
             except:
                 return
         else:
-            queued = check[0]["file"]
-            language = await get_lang(chat_id)
-            _ = get_string(language)
-            title = (check[0]["title"]).title()
-            user = check[0]["by"]
-            original_chat_id = check[0]["chat_id"]
-            streamtype = check[0]["streamtype"]
-            videoid = check[0]["vidid"]
-            db[chat_id][0]["played"] = 0
-
-            exis = (check[0]).get("old_dur")
+            entry = check[0]
+            # Taken before refresh, which re-arms for the entry after this one.
+            stream = _take_armed(chat_id, entry)
+            prefetch.refresh(chat_id)
+            queued = entry["file"]
+            videoid = entry["vidid"]
+            original_chat_id = entry["chat_id"]
+            video = True if str(entry["streamtype"]) == "video" else False
+            entry["played"] = 0
+
+            exis = entry.get("old_dur")
             if exis:
-                db[chat_id][0]["dur"] = exis
-                db[chat_id][0]["seconds"] = check[0]["old_second"]
-                db[chat_id][0]["speed_path"] = None
-                db[chat_id][0]["speed"] = 1.0
+                entry["dur"] = exis
+                entry["seconds"] = entry["old_second"]
+                entry["speed_path"] = None
+                entry["speed"] = 1.0
+
+            # Pre-armed: switch first, everything else happens afterwards.
+            if stream:
+                try:
+                    await client.play(chat_id, stream)
+                except Exception:
+                    stream = None
+            if stream:
+                asyncio.create_task(self._announce(chat_id, entry))
+                arm(chat_id)
+                return
 
-            video = True if str(streamtype) == "video" else False
+            language = await get_lang(chat_id)
+            _ = get_string(language)
 
             if "live_" in queued:
                 n, link = await YouTube.video(videoid, True)
                 if n == 0:
                     return await app.send_message(original_chat_id, text=_["call_6"])
-
                 stream = dynamic_media_stream(path=link, video=video)
-                try:
-                    await client.play(chat_id, stream)
-                except Exception:
-                    return await app.send_message(original_chat_id, text=_["call_6"])
-
-                img = await get_thumb(videoid)
-                button = stream_markup(_, chat_id)
-                run = await app.send_photo(
-                    chat_id=original_chat_id,
-                    photo=img,
-                    caption=_["stream_1"].format(
-                        f"https://t.me/{app.username}?start=info_{videoid}",
-                        title[:23],
-                        check[0]["dur"],
-                        user,
-                    ),
-                    reply_markup=InlineKeyboardMarkup(button),
-                )
-                db[chat_id][0]["mystic"] = run
-                db[chat_id][0]["markup"] = "tg"
 
             elif "vid_" in queued:
-                mystic = await app.send_message(original_chat_id, _["call_7"])
-                try:
-                    file_path, direct = await YouTube.download(
-                        videoid,
-                        mystic,
-                        videoid=True,
-                        video=True if str(streamtype) == "video" else False,
-                    )
-                except:
-                    return await mystic.edit_text(
-                        _["call_6"], disable_web_page_preview=True
+                file_path = prefetch.ready_path(chat_id, entry)
+                if not file_path:
+                    notice = asyncio.create_task(
+                        app.send_message(original_chat_id, _["call_7"])
                     )
-
+                    try:
+                        file_path, direct = await YouTube.download(
+                            videoid,
+                            None,
+                            videoid=True,
+                            video=video,
+                            chat_id=chat_id,
+                        )
+                    except:
+                        mystic = await notice
+                        return await mystic.edit_text(
+                            _["call_6"], disable_web_page_preview=True
+                        )
+                    asyncio.create_task(_drop_notice(notice))
+                _hold(entry, file_path)
                 stream = dynamic_media_stream(path=file_path, video=video)
-                try:
-                    await client.play(chat_id, stream)
-                except:
-                    return await app.send_message(original_chat_id, text=_["call_6"])
-
-                img = await get_thumb(videoid)
-                button = stream_markup(_, chat_id)
-                await mystic.delete()
-                run = await app.send_photo(
-                    chat_id=original_chat_id,
-                    photo=img,
-                    caption=_["stream_1"].format(
-                        f"https://t.me/{app.username}?start=info_{videoid}",
-                        title[:23],
-                        check[0]["dur"],
-                        user,
-                    ),
-                    reply_markup=InlineKeyboardMarkup(button),
-                )
-                db[chat_id][0]["mystic"] = run
-                db[chat_id][0]["markup"] = "stream"
 
             elif "index_" in queued:
                 stream = dynamic_media_stream(path=videoid, video=video)
-                try:
-                    await client.play(chat_id, stream)
-                except:
-                    return await app.send_message(original_chat_id, text=_["call_6"])
-
-                button = stream_markup(_, chat_id)
-                run = await app.send_photo(
-                    chat_id=original_chat_id,
-                    photo=config.STREAM_IMG_URL,
-                    caption=_["stream_2"].format(user),
-                    reply_markup=InlineKeyboardMarkup(button),
-                )
-                db[chat_id][0]["mystic"] = run
-                db[chat_id][0]["markup"] = "tg"
 
             else:
                 stream = dynamic_media_stream(path=queued, video=video)
-                try:
-                    await client.play(chat_id, stream)
-                except:
-                    return await app.send_message(original_chat_id, text=_["call_6"])
 
-                if videoid == "telegram":
-                    button = stream_markup(_, chat_id)
-                    run = await app.send_photo(
-                        chat_id=original_chat_id,
-                        photo=(
-                            config.TELEGRAM_AUDIO_URL
-                            if str(streamtype) == "audio"
-                            else config.TELEGRAM_VIDEO_URL
-                        ),
-                        caption=_["stream_1"].format(
-                            config.SUPPORT_CHAT, title[:23], check[0]["dur"], user
-                        ),
-                        reply_markup=InlineKeyboardMarkup(button),
-                    )
-                    db[chat_id][0]["mystic"] = run
-                    db[chat_id][0]["markup"] = "tg"
+            try:
+                await client.play(chat_id, stream)
+            except:
+                return await app.send_message(original_chat_id, text=_["call_6"])
+            asyncio.create_task(self._announce(chat_id, entry, _))
+            arm(chat_id)
+
+    async def _resume_progressive(self, client, chat_id: int) -> bool:
+        """Re-play a progressive track whose feed ended before the track did."""
+        queue = db.get(chat_id)
+        if not queue:
+            return False
+        entry = queue[0]
+        resumed = await progressive.resume(chat_id, entry.get("file"))
+        if not resumed or db.get(chat_id) is not queue or not queue or queue[0] is not entry:
+            return False
+        path, seconds = resumed
+        stream = dynamic_media_stream(
+            path=path,
+            video=str(entry.get("streamtype")) == "video",
+            ffmpeg_params=f"-ss {seconds}" if seconds else None,
+        )
+        try:
+            await client.play(chat_id, stream)
+        except Exception as e:
+            LOGGER(__name__).warning(f"Could not resume progressive track in {chat_id}: {e}")
+            return False
+        return True
+
+    async def _announce(self, chat_id: int, entry: dict, _=None) -> None:
+        """Now-playing card for a track that is already on air."""
+        try:
+            if _ is None:
+                _ = get_string(await get_lang(chat_id))
+            queued = entry["file"]
+            videoid = entry["vidid"]
+            title = entry["title"].title()
+            user = entry["by"]
+            if "index_" in queued:
+                photo, caption, markup = config.STREAM_IMG_URL, _["stream_2"].format(user), "tg"
+            elif videoid in ("telegram", "soundcloud"):
+                if videoid == "soundcloud":
+                    photo = config.SOUNCLOUD_IMG_URL
+                elif str(entry["streamtype"]) == "audio":
+                    photo = config.TELEGRAM_AUDIO_URL
+                else:
+                    photo = config.TELEGRAM_VIDEO_URL
+                caption = _["stream_1"].format(config.SUPPORT_CHAT, title[:23], entry["dur"], user)
+                markup = "tg"
+            else:
+                photo = await get_thumb(videoid)
+                caption = _["stream_1"].format(
+                    f"https://t.me/{app.username}?start=info_{videoid}",
+                    title[:23],
+                    entry["dur"],
+                    user,
+                )
+                markup = "tg" if "live_" in queued else "stream"
 
-                elif videoid == "soundcloud":
-                    button = stream_markup(_, chat_id)
+            button = stream_markup(_, chat_id)
+            for attempt in range(2):
+                try:
                     run = await app.send_photo(
-                        chat_id=original_chat_id,
-                        photo=config.SOUNCLOUD_IMG_URL,
-                        caption=_["stream_1"].format(
-                            config.SUPPORT_CHAT, title[:23], check[0]["dur"], user
-                        ),
+                        chat_id=entry["chat_id"],
+                        photo=photo,
+                        caption=caption,
                         reply_markup=InlineKeyboardMarkup(button),
                     )
-                    db[chat_id][0]["mystic"] = run
-                    db[chat_id][0]["markup"] = "tg"
+                    break
+                except FloodWait as e:
+                    if attempt:
+                        raise
+                    LOGGER(__name__).warning(f"FloodWait: Sleeping for {e.value}")
+                    await asyncio.sleep(e.value)
+            entry["mystic"] = run
+            entry["markup"] = markup
+        except Exception as e:
+            LOGGER(__name__).warning(f"Now-playing message for {chat_id} failed: {e}")
 
-                else:
-                    img = await get_thumb(videoid)
-                    button = stream_markup(_, chat_id)
-                    try:
-                        run = await app.send_photo(
-                            chat_id=original_chat_id,
-                            photo=img,
-                            caption=_["stream_1"].format(
-                                f"https://t.me/{app.username}?start=info_{videoid}",
-                                title[:23],
-                                check[0]["dur"],
-                                user,
-                            ),
-                            reply_markup=InlineKeyboardMarkup(button),
-                        )
-                    except FloodWait as e:
-                        LOGGER(__name__).warning(f"FloodWait: Sleeping for {e.value}")
-                        await asyncio.sleep(e.value)
-                        run = await app.send_photo(
-                            chat_id=original_chat_id,
-                            photo=img,
-                            caption=_["stream_1"].format(
-                                f"https://t.me/{app.username}?start=info_{videoid}",
-                                title[:23],
-                                check[0]["dur"],
-                                user,
-                            ),
-                            reply_markup=InlineKeyboardMarkup(button),
-                        )
-                    db[chat_id][0]["mystic"] = run
-                    db[chat_id][0]["markup"] = "stream"
+    async def _start_client(self, number: int, client: PyTgCalls) -> None:
+        try:
+            await asyncio.wait_for(client.start(), config.ASSISTANT_START_TIMEOUT)
+        except Exception as e:
+            from ANNIEMUSIC.core.userbot import assistants
 
+            # Never place chats on an assistant that cannot stream.
+            if number in assistants:
+                assistants.remove(number)
+            LOGGER(__name__).error(f"Failed to start PyTgCalls client {number}: {e}")
 
     async def start(self) -> None:
         LOGGER(__name__).info("Starting PyTgCalls Clients...")
-        if config.STRING1:
-            await self.one.start()
-        if config.STRING2:
-            await self.two.start()
-        if config.STRING3:
-            await self.three.start()
-        if config.STRING4:
-            await self.four.start()
-        if config.STRING5:
-            await self.five.start()
+        await asyncio.gather(
+            *(self._start_client(n, client) for n, client in self.clients.items())
+        )
 
     @capture_internal_err
     async def ping(self) -> str:
-        pings = []
-        if config.STRING1:
-            pings.append(self.one.ping)
-        if config.STRING2:
-            pings.append(self.two.ping)
-        if config.STRING3:
-            pings.append(self.three.ping)
-        if config.STRING4:
-            pings.append(self.four.ping)
-        if config.STRING5:
-            pings.append(self.five.ping)
+        pings = [client.ping for client in self.clients.values()]
         return str(round(sum(pings) / len(pings), 3)) if pings else "0.0"
 
     @capture_internal_err
     async def decorators(self) -> None:
-        assistants = list(filter(None, [self.one, self.two, self.three, self.four, self.five]))
+        assistants = list(self.clients.values())
 
         CRITICAL = (
             ChatUpdate.Status.KICKED
@@ -503,6 +535,8 @@ class Call:
                 elif isinstance(update, StreamEnded):
                     if update.stream_type == StreamEnded.Type.AUDIO:
                         assistant = await group_assistant(self, update.chat_id)
+                        if await self._resume_progressive(assistant, update.chat_id):
+                            return
                         await self.play(assistant, update.chat_id)
 
             except Exception:
@@ -1,3 +1,6 @@
+import asyncio
+from typing import Dict, Optional
+
 from pyrogram import Client
 
 import config
@@ -14,55 +17,27 @@ GROUPS_TO_JOIN = [
 # Initialize userbots
 class Userbot:
     def __init__(self):
-        self.one = Client(
-            "AnnieAssis1",
-            config.API_ID,
-            config.API_HASH,
-            session_string=str(config.STRING1),
-            no_updates=True,
-        )
-        self.two = Client(
-            "AnnieAssis2",
-            config.API_ID,
-            config.API_HASH,
-            session_string=str(config.STRING2),
-            no_updates=True,
-        )
-        self.three = Client(
-            "AnnieAssis3",
-            config.API_ID,
-            config.API_HASH,
-            session_string=str(config.STRING3),
-            no_updates=True,
-        )
-        self.four = Client(
-            "AnnieAssis4",
-            config.API_ID,
-            config.API_HASH,
-            session_string=str(config.STRING4),
-            no_updates=True,
-        )
-        self.five = Client(
-            "AnnieAssis5",
-            config.API_ID,
-            config.API_HASH,
-            session_string=str(config.STRING5),
-            no_updates=True,
-        )
+        self.clients: Dict[int, Client] = {
+            number: Client(
+                f"AnnieAssis{number}",
+                config.API_ID,
+                config.API_HASH,
+                session_string=str(session),
+                no_updates=True,
+            )
+            for number, session in config.STRING_SESSIONS.items()
+        }
 
-    async def start_assistant(self, client: Client, index: int):
-        string_attr = [
-            config.STRING1,
-            config.STRING2,
-            config.STRING3,
-            config.STRING4,
-            config.STRING5,
-        ][index - 1]
-        if not string_attr:
-            return
+    def get(self, number: int) -> Optional[Client]:
+        return self.clients.get(int(number))
 
+    @property
+    def one(self) -> Optional[Client]:
+        return self.get(1)
+
+    async def start_assistant(self, client: Client, index: int):
         try:
-            await client.start()
+            await asyncio.wait_for(client.start(), config.ASSISTANT_START_TIMEOUT)
             for group in GROUPS_TO_JOIN:
                 try:
                     await client.join_chat(group)
@@ -91,25 +66,18 @@ class Userbot:
             LOGGER(__name__).error(f"Failed to start Assistant {index}: {e}")
 
     async def start(self):
-        LOGGER(__name__).info("Starting ˹𝐒𝐢𝐲𝐚 ꭙ ᴀꜱꜱɪꜱᴛᴀɴᴛ˼ ⚡...")
-        await self.start_assistant(self.one, 1)
-        await self.start_assistant(self.two, 2)
-        await self.start_assistant(self.three, 3)
-        await self.start_assistant(self.four, 4)
-        await self.start_assistant(self.five, 5)
+        LOGGER(__name__).info("Starting ˹𝐒𝐢𝐲𝐚 ꭙ ᴀꜱꜱɪꜱᴛᴀɴᴛ˼ ⚡...")
+        await asyncio.gather(
+            *(self.start_assistant(client, n) for n, client in self.clients.items())
+        )
+        assistants.sort()
 
     async def stop(self):
         LOGGER(__name__).info("Stopping Assistants...")
-        try:
-            if config.STRING1:
-                await self.one.stop()
-            if config.STRING2:
-                await self.two.stop()
-            if config.STRING3:
-                await self.three.stop()
-            if config.STRING4:
-                await self.four.stop()
-            if config.STRING5:
-                await self.five.stop()
-        except Exception as e:
-            LOGGER(__name__).error(f"Error while stopping assistants: {e}")
\ No newline at end of file
+        results = await asyncio.gather(
+            *(client.stop() for client in self.clients.values() if client.is_connected),
+            return_exceptions=True,
+        )
+        for err in results:
+            if isinstance(err, Exception):
+                LOGGER(__name__).error(f"Error while stopping assistants: {err}")
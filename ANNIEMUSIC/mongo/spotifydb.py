@@ -0,0 +1,62 @@
+import time
+from typing import Dict, Optional
+
+from ANNIEMUSIC.core.mongo import mongodb
+from ANNIEMUSIC.logging import LOGGER
+from ANNIEMUSIC.utils.tuning import SPOTIFY_MAP_TTL
+
+_map = mongodb["spotify_map"]
+
+
+async def ensure_indexes() -> None:
+    """ISRC fallback lookups sort overrides first; serve them from one index."""
+    try:
+        await _map.create_index([("isrc", 1), ("override", -1)])
+    except Exception as e:
+        LOGGER(__name__).warning(f"Spotify map index creation failed: {e}")
+
+
+def _fresh(doc: Optional[Dict]) -> Optional[Dict]:
+    if not doc:
+        return None
+    if doc.get("override") or time.time() - doc.get("updated", 0) <= SPOTIFY_MAP_TTL:
+        return doc
+    return None
+
+
+async def get_mapping(track_id: str, isrc: Optional[str] = None) -> Optional[Dict]:
+    """Resolved YouTube id for a Spotify track, by track id and then ISRC."""
+    try:
+        doc = _fresh(await _map.find_one({"_id": track_id}))
+        if not doc and isrc:
+            doc = _fresh(await _map.find_one({"isrc": isrc}, sort=[("override", -1)]))
+        return doc
+    except Exception as e:
+        LOGGER(__name__).warning(f"Spotify map read failed: {e}")
+        return None
+
+
+async def save_mapping(track_id: str, vidid: str, isrc: Optional[str] = None) -> None:
+    try:
+        # Never let an automatic match replace a manual override.
+        await _map.update_one(
+            {"_id": track_id, "override": {"$ne": True}},
+            {"$set": {"vidid": vidid, "isrc": isrc, "updated": time.time()}},
+            upsert=True,
+        )
+    except Exception as e:
+        # A duplicate key here means an override already exists.
+        LOGGER(__name__).debug(f"Spotify map write skipped: {e}")
+
+
+async def set_override(track_id: str, vidid: str, isrc: Optional[str] = None) -> None:
+    await _map.update_one(
+        {"_id": track_id},
+        {"$set": {"vidid": vidid, "isrc": isrc, "override": True, "updated": time.time()}},
+        upsert=True,
+    )
+
+
+async def clear_override(track_id: str) -> bool:
+    res = await _map.delete_one({"_id": track_id})
+    return bool(res.deleted_count)
@@ -0,0 +1,97 @@
+import time
+from typing import Dict, Optional
+
+from ANNIEMUSIC.core.mongo import mongodb
+from ANNIEMUSIC.logging import LOGGER
+from ANNIEMUSIC.utils.tuning import TRACK_QUERY_TTL, TRACK_STORE_TTL
+
+_tracks = mongodb["tracks"]
+_queries = mongodb["track_queries"]
+
+
+def _doc_from_item(item: Dict) -> Dict:
+    thumbs = item.get("thumbnails") or [{}]
+    channel = item.get("channel") or {}
+    return {
+        "title": item.get("title", ""),
+        "duration": item.get("duration"),
+        "thumb": (thumbs[0].get("url") or "").split("?")[0],
+        "link": item.get("link", ""),
+        "views": (item.get("viewCount") or {}).get("short"),
+        "views_text": (item.get("viewCount") or {}).get("text"),
+        "published": item.get("publishedTime"),
+        "description": item.get("descriptionSnippet"),
+        "accessibility": item.get("accessibility"),
+        "channel": channel.get("name"),
+        "channel_id": channel.get("id"),
+        "channel_link": channel.get("link"),
+        "updated": time.time(),
+    }
+
+
+def _item_from_doc(doc: Dict) -> Dict:
+    """
+    Rebuild the VideosSearch result shape the callers already consume.
+    Fields missing from documents stored by older builds get defaults.
+    """
+    return {
+        "type": "video",
+        "id": doc["_id"],
+        "title": doc.get("title", ""),
+        "publishedTime": doc.get("published") or "Unknown",
+        "duration": doc.get("duration"),
+        "viewCount": {
+            "text": doc.get("views_text") or "Unknown Views",
+            "short": doc.get("views") or "Unknown Views",
+        },
+        "thumbnails": [{"url": doc.get("thumb", "")}],
+        "richThumbnail": None,
+        "descriptionSnippet": doc.get("description"),
+        "channel": {
+            "name": doc.get("channel"),
+            "id": doc.get("channel_id"),
+            "link": doc.get("channel_link"),
+        },
+        "accessibility": doc.get("accessibility")
+        or {"title": doc.get("title", ""), "duration": doc.get("duration")},
+        "link": doc.get("link", ""),
+        "shelfTitle": None,
+    }
+
+
+async def get_track(video_id: str) -> Optional[Dict]:
+    try:
+        doc = await _tracks.find_one({"_id": video_id})
+    except Exception as e:
+        LOGGER(__name__).warning(f"Track store read failed: {e}")
+        return None
+    if not doc or time.time() - doc.get("updated", 0) > TRACK_STORE_TTL:
+        return None
+    return _item_from_doc(doc)
+
+
+async def get_query(query: str) -> Optional[Dict]:
+    try:
+        doc = await _queries.find_one({"_id": query})
+    except Exception as e:
+        LOGGER(__name__).warning(f"Track store read failed: {e}")
+        return None
+    if not doc or time.time() - doc.get("updated", 0) > TRACK_QUERY_TTL:
+        return None
+    return await get_track(doc["vidid"])
+
+
+async def save_track(item: Dict, query: Optional[str] = None) -> None:
+    vid = item.get("id")
+    if not vid:
+        return
+    try:
+        await _tracks.update_one({"_id": vid}, {"$set": _doc_from_item(item)}, upsert=True)
+        if query:
+            await _queries.update_one(
+                {"_id": query},
+                {"$set": {"vidid": vid, "updated": time.time()}},
+                upsert=True,
+            )
+    except Exception as e:
+        LOGGER(__name__).warning(f"Track store write failed: {e}")
@@ -1,9 +1,8 @@
 import re
 from typing import List, Union, Optional
 
-import aiohttp
-from bs4 import BeautifulSoup
-from youtubesearchpython.__future__ import VideosSearch
+from ANNIEMUSIC.utils.meta_cache import youtube_search
+from ANNIEMUSIC.utils.scrape import first, page_meta
 
 
 class AppleAPI:
@@ -18,28 +17,19 @@ class AppleAPI:
         if playid:
             url = self.base + url
 
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as response:
-                if response.status != 200:
-                    return False
-                html = await response.text()
-
-        soup = BeautifulSoup(html, "html.parser")
-        title_query: Optional[str] = None
-        for tag in soup.find_all("meta"):
-            if tag.get("property") == "og:title":
-                title_query = tag.get("content")
-                break
+        meta = await page_meta(url)
+        if meta is None:
+            return False
 
+        title_query: Optional[str] = first(meta, "og:title")
         if not title_query:
             return False
 
-        results = VideosSearch(title_query, limit=1)
-        data = await results.next()
-        if not data.get("result"):
+        items = await youtube_search(title_query)
+        if not items:
             return False
 
-        r = data["result"][0]
+        r = items[0]
         track_details = {
             "title": r.get("title", ""),
             "link": r.get("link", ""),
@@ -58,18 +48,16 @@ class AppleAPI:
         except Exception:
             return False
 
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as response:
-                if response.status != 200:
-                    return False
-                html = await response.text()
+        meta = await page_meta(url)
+        if meta is None:
+            return False
 
-        soup = BeautifulSoup(html, "html.parser")
-        applelinks = soup.find_all("meta", attrs={"property": "music:song"})
         results: List[str] = []
-        for item in applelinks:
+        for key, content in meta:
+            if key != "music:song":
+                continue
             try:
-                slug = item["content"].split("album/")[1].split("/")[0]
+                slug = content.split("album/")[1].split("/")[0]
                 results.append(slug.replace("-", " "))
             except Exception:
                 continue
@@ -1,9 +1,8 @@
 import re
 from typing import Union
 
-import aiohttp
-from bs4 import BeautifulSoup
-from youtubesearchpython.__future__ import VideosSearch
+from ANNIEMUSIC.utils.meta_cache import youtube_search
+from ANNIEMUSIC.utils.scrape import first, page_meta
 
 
 class RessoAPI:
@@ -20,25 +19,14 @@ class RessoAPI:
     async def track(self, url, playid: Union[bool, str] = None):
         if playid:
             url = self.base + url
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as response:
-                if response.status != 200:
-                    return False
-                html = await response.text()
-        soup = BeautifulSoup(html, "html.parser")
-        for tag in soup.find_all("meta"):
-            if tag.get("property", None) == "og:title":
-                title = tag.get("content", None)
-            if tag.get("property", None) == "og:description":
-                des = tag.get("content", None)
-                try:
-                    des = des.split("·")[0]
-                except:
-                    pass
-        if des == "":
+        meta = await page_meta(url)
+        if meta is None:
+            return False
+        title = first(meta, "og:title")
+        des = (first(meta, "og:description") or "").split("·")[0]
+        if des == "" or not title:
             return
-        results = VideosSearch(title, limit=1)
-        for result in (await results.next())["result"]:
+        for result in await youtube_search(title):
             title = result["title"]
             ytlink = result["link"]
             vidid = result["id"]
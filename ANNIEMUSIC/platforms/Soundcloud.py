@@ -1,10 +1,7 @@
-import asyncio
 import re
 from typing import Any, Dict, Optional, Tuple, Union
 
-from yt_dlp import YoutubeDL
-
-from ANNIEMUSIC.utils.downloader import download_audio_concurrent
+from ANNIEMUSIC.utils.downloader import download_audio_concurrent, extract_info
 from ANNIEMUSIC.utils.formatters import seconds_to_min
 
 
@@ -15,25 +12,8 @@ class SoundAPI:
     async def valid(self, link: str) -> bool:
         return bool(link and _SC_RE.match(link))
 
-    async def _extract_info(self, url: str) -> Dict[str, Any]:
-        def _run():
-            opts = {
-                "quiet": True,
-                "no_warnings": True,
-                "noplaylist": True,
-                "skip_download": True,
-            }
-            with YoutubeDL(opts) as ydl:
-                return ydl.extract_info(url, download=False)
-
-        loop = asyncio.get_running_loop()
-        return await loop.run_in_executor(None, _run)
-
     async def download(self, url: str) -> Union[Tuple[Dict[str, Any], str], bool]:
-        try:
-            info = await self._extract_info(url)
-        except Exception:
-            return False
+        info = await extract_info(url)
 
         if not info or info.get("_type") == "playlist":
             return False
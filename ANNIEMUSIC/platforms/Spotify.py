@@ -1,10 +1,47 @@
+import asyncio
 import re
+from typing import Any, Dict, List, Optional, Tuple
 
 import spotipy
 from spotipy.oauth2 import SpotifyClientCredentials
-from youtubesearchpython.__future__ import VideosSearch
 
 import config
+from ANNIEMUSIC.mongo import spotifydb
+from ANNIEMUSIC.utils.formatters import time_to_seconds
+from ANNIEMUSIC.utils.meta_cache import MISS, TTLCache, youtube_search
+from ANNIEMUSIC.utils.tuning import SPOTIFY_CACHE_MAX, SPOTIFY_CACHE_TTL
+
+YT_WATCH = "https://www.youtube.com/watch?v="
+
+_responses = TTLCache(SPOTIFY_CACHE_MAX, SPOTIFY_CACHE_TTL, SPOTIFY_CACHE_TTL)
+
+
+def _query(track: Dict[str, Any]) -> str:
+    info = track["name"]
+    for artist in track.get("artists") or []:
+        fetched = f' {artist["name"]}'
+        if "Various Artists" not in fetched:
+            info += fetched
+    return info
+
+
+def _entry(track: Dict[str, Any]) -> Dict[str, Any]:
+    """Playlist entry carrying what the mapping cache is keyed on."""
+    return {
+        "id": track.get("id"),
+        "isrc": (track.get("external_ids") or {}).get("isrc"),
+        "query": _query(track),
+    }
+
+
+def _details(item: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "title": item["title"],
+        "link": item["link"],
+        "vidid": item["id"],
+        "duration_min": item["duration"],
+        "thumb": item["thumbnails"][0]["url"].split("?")[0],
+    }
 
 
 class SpotifyAPI:
@@ -13,11 +50,14 @@ class SpotifyAPI:
         self.client_id = config.SPOTIFY_CLIENT_ID
         self.client_secret = config.SPOTIFY_CLIENT_SECRET
         if self.client_id and self.client_secret:
+            # The credentials manager keeps the app token and refreshes it
+            # only when it expires.
             self.client_credentials_manager = SpotifyClientCredentials(
                 self.client_id, self.client_secret
             )
             self.spotify = spotipy.Spotify(
-                client_credentials_manager=self.client_credentials_manager
+                client_credentials_manager=self.client_credentials_manager,
+                requests_timeout=10,
             )
         else:
             self.spotify = None
@@ -25,70 +65,106 @@ class SpotifyAPI:
     async def valid(self, link: str) -> bool:
         return bool(re.search(self.regex, link or ""))
 
-    async def track(self, link: str):
+    async def _call(self, method: str, *args, cache_key: str = None, **kwargs):
+        """Run a blocking spotipy call off the event loop, with caching."""
         if not self.spotify:
             raise RuntimeError("Spotify credentials not configured")
-        track = self.spotify.track(link)
-        info = track["name"]
-        for artist in track["artists"]:
-            fetched = f' {artist["name"]}'
-            if "Various Artists" not in fetched:
-                info += fetched
-        results = VideosSearch(info, limit=1)
-        data = await results.next()
-        r = data["result"][0]
-        track_details = {
-            "title": r["title"],
-            "link": r["link"],
-            "vidid": r["id"],
-            "duration_min": r["duration"],
-            "thumb": r["thumbnails"][0]["url"].split("?")[0],
-        }
+        key = cache_key or f"{method}:{args}:{sorted(kwargs.items())}"
+        cached = _responses.get(key)
+        if cached is not MISS and cached is not None:
+            return cached
+        func = getattr(self.spotify, method)
+        loop = asyncio.get_running_loop()
+        data = await loop.run_in_executor(None, lambda: func(*args, **kwargs))
+        _responses.set(key, data)
+        return data
+
+    async def _collect(self, page: Dict[str, Any], limit: int) -> List[Dict[str, Any]]:
+        """Follow ``next`` links until ``limit`` items have been gathered."""
+        items = list(page.get("items") or [])
+        while page.get("next") and len(items) < limit:
+            page = await self._call("next", page, cache_key=f"next:{page['next']}")
+            if not page:
+                break
+            items.extend(page.get("items") or [])
+        return items[:limit]
+
+    async def resolve(self, entry: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        YouTube search item for a Spotify track. Known tracks are looked up
+        by id or ISRC in the persistent map; new ones are searched once and
+        remembered.
+        """
+        track_id, isrc = entry.get("id"), entry.get("isrc")
+        if track_id:
+            mapped = await spotifydb.get_mapping(track_id, isrc)
+            if mapped:
+                items = await youtube_search(YT_WATCH + mapped["vidid"])
+                if items:
+                    return items[0]
+        items = await youtube_search(entry["query"])
+        if not items:
+            return None
+        if track_id:
+            asyncio.create_task(spotifydb.save_mapping(track_id, items[0]["id"], isrc))
+        return items[0]
+
+    async def details(self, entry: Dict[str, Any]) -> Tuple[str, Optional[str], int, str, str]:
+        """Same shape as ``YouTubeAPI.details`` for playlist resolution."""
+        item = await self.resolve(entry)
+        if not item:
+            raise ValueError("Track not found")
+        d = _details(item)
+        dt = d["duration_min"]
+        return d["title"], dt, int(time_to_seconds(dt)) if dt else 0, d["thumb"], d["vidid"]
+
+    async def track(self, link: str):
+        track = await self._call("track", link)
+        item = await self.resolve(_entry(track))
+        if not item:
+            raise ValueError("Track not found")
+        track_details = _details(item)
+        return track_details, track_details["vidid"]
+
+    async def isrc(self, link: str) -> Optional[str]:
+        track = await self._call("track", link)
+        return (track.get("external_ids") or {}).get("isrc")
+
+    async def search(self, query: str):
+        """Find ``query`` on Spotify and map the best hit to YouTube."""
+        found = await self._call("search", q=query, type="track", limit=1)
+        tracks = (found.get("tracks") or {}).get("items") or []
+        if not tracks:
+            return None, None
+        item = await self.resolve(_entry(tracks[0]))
+        if not item:
+            return None, None
+        track_details = _details(item)
         return track_details, track_details["vidid"]
 
     async def playlist(self, url):
-        if not self.spotify:
-            raise RuntimeError("Spotify credentials not configured")
-        playlist = self.spotify.playlist(url)
+        limit = config.PLAYLIST_FETCH_LIMIT
+        playlist = await self._call(
+            "playlist",
+            url,
+            fields="id,tracks(items(track(id,name,external_ids,artists(name))),next)",
+        )
         playlist_id = playlist["id"]
-        results = []
-        for item in playlist["tracks"]["items"]:
-            music_track = item["track"]
-            info = music_track["name"]
-            for artist in music_track["artists"]:
-                fetched = f' {artist["name"]}'
-                if "Various Artists" not in fetched:
-                    info += fetched
-            results.append(info)
+        items = await self._collect(playlist["tracks"], limit)
+        results = [_entry(item["track"]) for item in items if item.get("track")]
         return results, playlist_id
 
     async def album(self, url):
-        if not self.spotify:
-            raise RuntimeError("Spotify credentials not configured")
-        album = self.spotify.album(url)
+        limit = config.PLAYLIST_FETCH_LIMIT
+        album = await self._call("album", url)
         album_id = album["id"]
-        results = []
-        for item in album["tracks"]["items"]:
-            info = item["name"]
-            for artist in item["artists"]:
-                fetched = f' {artist["name"]}'
-                if "Various Artists" not in fetched:
-                    info += fetched
-            results.append(info)
+        items = await self._collect(album["tracks"], limit)
+        results = [_entry(item) for item in items]
         return results, album_id
 
     async def artist(self, url):
-        if not self.spotify:
-            raise RuntimeError("Spotify credentials not configured")
-        artistinfo = self.spotify.artist(url)
+        artistinfo = await self._call("artist", url)
         artist_id = artistinfo["id"]
-        results = []
-        artisttoptracks = self.spotify.artist_top_tracks(url)
-        for item in artisttoptracks["tracks"]:
-            info = item["name"]
-            for artist in item["artists"]:
-                fetched = f' {artist["name"]}'
-                if "Various Artists" not in fetched:
-                    info += fetched
-            results.append(info)
-        return results, artist_id
\ No newline at end of file
+        artisttoptracks = await self._call("artist_top_tracks", url)
+        results = [_entry(item) for item in artisttoptracks["tracks"]]
+        return results, artist_id
@@ -4,28 +4,43 @@ import json
 import os
 import re
 import time
-from typing import Dict, List, Optional, Tuple, Union
+from typing import AsyncIterator, Dict, List, Optional, Tuple, Union
 
 import yt_dlp
 from pyrogram.enums import MessageEntityType
 from pyrogram.types import Message
-from youtubesearchpython.__future__ import VideosSearch
 
+from ANNIEMUSIC.misc import db
 from ANNIEMUSIC.utils.cookie_handler import COOKIE_PATH
 from ANNIEMUSIC.utils.database import is_on_off
-from ANNIEMUSIC.utils.downloader import download_audio_concurrent, yt_dlp_download
+from ANNIEMUSIC.utils.downloader import (
+    download_audio_concurrent,
+    extract_info,
+    iter_playlist,
+    yt_dlp_download,
+)
 from ANNIEMUSIC.utils.errors import capture_internal_err
-from ANNIEMUSIC.utils.formatters import time_to_seconds
+from ANNIEMUSIC.utils.formatters import seconds_to_min, time_to_seconds
+from ANNIEMUSIC.utils.meta_cache import MISS, TTLCache, video_id_of, youtube_search
+from ANNIEMUSIC.utils.scheduler import NOW_PLAYING
 from ANNIEMUSIC.utils.tuning import (
+    LIVE_URL_FALLBACK_TTL,
+    LIVE_URL_MARGIN,
     YTDLP_TIMEOUT,
     YOUTUBE_META_MAX,
+    YOUTUBE_META_NEG_TTL,
     YOUTUBE_META_TTL,
 )
 
-_cache: Dict[str, Tuple[float, List[Dict]]] = {}
-_cache_lock = asyncio.Lock()
+_PLAYLIST_ID = re.compile(r"list=([A-Za-z0-9_-]+)")
+_EXPIRE = re.compile(r"expire[=/](\d+)")
+
+_live_status = TTLCache(YOUTUBE_META_MAX, YOUTUBE_META_TTL, YOUTUBE_META_NEG_TTL)
 _formats_cache: Dict[str, Tuple[float, List[Dict], str]] = {}
 _formats_lock = asyncio.Lock()
+_live_urls: Dict[str, Tuple[float, str]] = {}
+_live_inflight: Dict[str, asyncio.Task] = {}
+_live_refresh: Dict[str, asyncio.TimerHandle] = {}
 
 
 def _cookiefile_path() -> Optional[str]:
@@ -55,30 +70,100 @@ async def _exec_proc(*args: str) -> Tuple[bytes, bytes]:
         return b"", b"timeout"
 
 
-@capture_internal_err
-async def cached_youtube_search(query: str) -> List[Dict]:
-    key = f"q:{query}"
-    now = time.time()
-    async with _cache_lock:
-        if key in _cache:
-            ts, val = _cache[key]
-            if now - ts < YOUTUBE_META_TTL:
-                print(f"[DEBUG] Using cached result for query: {query}")
-                return val
-            _cache.pop(key, None)
-        if len(_cache) > YOUTUBE_META_MAX:
-            _cache.clear()
+def _live_from_search(item: Optional[Dict]) -> Optional[bool]:
+    # Finished uploads always carry a duration in search results; streams,
+    # live or upcoming, come back without one and need a real extraction.
+    if not item:
+        return None
+    duration = str(item.get("duration") or "").strip().lower()
+    if duration and duration not in ("live", "live now"):
+        return False
+    return None
+
+
+def _url_expiry(url: str) -> float:
+    # HLS manifests carry it as a path segment, DASH and progressive URLs as
+    # a query parameter.
+    match = _EXPIRE.search(url)
+    if match:
+        return float(match.group(1))
+    return time.time() + LIVE_URL_FALLBACK_TTL
+
+
+def _live_in_use(vid: str) -> bool:
+    for queue in list(db.values()):
+        head = queue[0] if queue else {}
+        if head.get("vidid") == vid and "live_" in str(head.get("file", "")):
+            return True
+    return False
+
+
+async def _resolve_live(key: str, link: str) -> Tuple[int, str]:
+    stdout, stderr = await _exec_proc(
+        "yt-dlp",
+        *(_cookies_args()),
+        "-g",
+        "-f",
+        "best[height<=?720][width<=?1280]",
+        link,
+    )
+    if not stdout:
+        return 0, stderr.decode()
+    url = stdout.decode().split("\n")[0]
+    expires = _url_expiry(url)
+    _live_urls[key] = (expires, url)
+    _schedule_refresh(key, link, expires)
+    return 1, url
+
+
+def _live_task(key: str, link: str) -> asyncio.Task:
+    task = _live_inflight.get(key)
+    if task is None:
+        task = _live_inflight[key] = asyncio.create_task(_resolve_live(key, link))
+        task.add_done_callback(lambda _: _live_inflight.pop(key, None))
+    return task
+
+
+def _schedule_refresh(key: str, link: str, expires: float) -> None:
+    # Re-resolve a margin ahead of the point where the cached URL stops being
+    # served, so seeks and replays on a long stream never wait on yt-dlp.
+    old = _live_refresh.pop(key, None)
+    if old:
+        old.cancel()
+    delay = max(expires - 2 * LIVE_URL_MARGIN - time.time(), 60)
+    _live_refresh[key] = asyncio.get_running_loop().call_later(
+        delay, _refresh_live, key, link
+    )
+
+
+def _refresh_live(key: str, link: str) -> None:
+    _live_refresh.pop(key, None)
+    if _live_in_use(key):
+        _live_task(key, link)
+    else:
+        _live_urls.pop(key, None)
+
+
+async def _chain(first: Dict, rest: AsyncIterator[Dict]) -> AsyncIterator[Dict]:
     try:
-        print(f"[DEBUG] Performing YouTube search via API for: {query}")
-        data = await VideosSearch(query, limit=1).next()
-        result = data.get("result", [])
-    except Exception as e:
-        print(f"[ERROR] VideosSearch failed: {e}")
-        result = []
-    if result:
-        async with _cache_lock:
-            _cache[key] = (now, result)
-    return result
+        yield first
+        async for entry in rest:
+            yield entry
+    finally:
+        await rest.aclose()
+
+
+def _flat_entry(entry: Dict) -> Dict:
+    """Queue-ready fields from a flat playlist entry."""
+    seconds = entry.get("duration")
+    thumbs = entry.get("thumbnails") or [{}]
+    return {
+        "vidid": entry["id"],
+        "title": entry.get("title") or "",
+        "duration_min": seconds_to_min(seconds) if seconds else None,
+        "duration_sec": int(seconds or 0),
+        "thumb": (thumbs[-1].get("url") or "").split("?")[0],
+    }
 
 
 class YouTubeAPI:
@@ -120,22 +205,12 @@ class YouTubeAPI:
         return None
 
     @capture_internal_err
-    async def _fetch_video_info(
-        self, query: str, *, use_cache: bool = True
-    ) -> Optional[Dict]:
+    async def _fetch_video_info(self, query: str) -> Optional[Dict]:
         q = self._prepare_link(query)
         try:
-            print(f"[DEBUG] Trying YouTube API search for query: {q}")
-            if use_cache and not q.startswith("http"):
-                res = await cached_youtube_search(q)
-                if res:
-                    print(f"[DEBUG] Found results from cache or API for: {q}")
-                    return res[0]
-            data = await VideosSearch(q, limit=1).next()
-            result = data.get("result", [])
-            if result:
-                print(f"[DEBUG] Found {len(result)} result(s) from VideosSearch for: {q}")
-                return result[0]
+            res = await youtube_search(q)
+            if res:
+                return res[0]
             print(f"[WARN] No results found for {q} using VideosSearch.")
         except Exception as e:
             print(f"[ERROR] VideosSearch failed for {q}: {e}")
@@ -144,17 +219,23 @@ class YouTubeAPI:
     @capture_internal_err
     async def is_live(self, link: str) -> bool:
         prepared = self._prepare_link(link)
-        print(f"[DEBUG] Checking if video is live: {prepared}")
-        stdout, _ = await _exec_proc(
-            "yt-dlp", *(_cookies_args()), "--dump-json", prepared
-        )
-        if not stdout:
-            return False
+        vid = video_id_of(prepared)
+        if vid:
+            cached = _live_status.get(vid)
+            if cached is not MISS and cached is not None:
+                return cached
         try:
-            info = json.loads(stdout.decode())
-            return bool(info.get("is_live"))
-        except json.JSONDecodeError:
-            return False
+            items = await youtube_search(prepared)
+        except Exception:
+            items = []
+        live = _live_from_search(items[0] if items else None)
+        if live is None:
+            print(f"[DEBUG] Checking if video is live: {prepared}")
+            info = await extract_info(prepared)
+            live = bool(info and (info.get("is_live") or info.get("live_status") == "is_live"))
+        if vid:
+            _live_status.set(vid, live)
+        return live
 
     @capture_internal_err
     async def details(
@@ -213,6 +294,51 @@ class YouTubeAPI:
         print(f"[DEBUG] Final track details: {details}")
         return details, info.get("id", "")
 
+    @capture_internal_err
+    async def video(
+        self, link: str, videoid: Union[str, bool, None] = None
+    ) -> Tuple[int, str]:
+        """Playable manifest URL of a live stream: ``(1, url)`` or ``(0, error)``."""
+        if videoid is True and not self._url_pattern.search(link):
+            link = self.base_url + link
+        link = self._prepare_link(link, videoid)
+        key = video_id_of(link) or link
+        cached = _live_urls.get(key)
+        if cached and cached[0] - LIVE_URL_MARGIN > time.time():
+            return 1, cached[1]
+        return await asyncio.shield(_live_task(key, link))
+
+    async def iter_playlist(
+        self, link: str, limit: int, videoid: Union[str, bool, None] = None
+    ) -> AsyncIterator[Dict]:
+        if isinstance(videoid, str) and videoid.strip():
+            link = self.playlist_url + videoid.strip()
+        match = _PLAYLIST_ID.search(link)
+        if match:
+            link = self.playlist_url + match.group(1)
+        async for entry in iter_playlist(link, limit):
+            yield _flat_entry(entry)
+
+    @capture_internal_err
+    async def playlist(
+        self,
+        link: str,
+        limit: int,
+        user_id: int,
+        videoid: Union[str, bool, None] = None,
+    ) -> AsyncIterator[Dict]:
+        """
+        Flat entries as an async iterator, so playback can start on the first
+        one while the rest are still being listed. The first entry is fetched
+        here so an empty or unavailable playlist fails up front.
+        """
+        entries = self.iter_playlist(link, limit, videoid)
+        try:
+            first = await entries.__anext__()
+        except StopAsyncIteration:
+            raise ValueError("Playlist is empty or unavailable")
+        return _chain(first, entries)
+
     @capture_internal_err
     async def download(
         self,
@@ -225,18 +351,24 @@ class YouTubeAPI:
         songvideo: Union[bool, str, None] = None,
         format_id: Union[bool, str, None] = None,
         title: Union[bool, str, None] = None,
+        priority: int = NOW_PLAYING,
+        chat_id: Optional[int] = None,
     ) -> Union[Tuple[str, Optional[bool]], Tuple[None, None]]:
         print(f"[DEBUG] Starting download for: {link}")
         link = self._prepare_link(link, videoid)
 
         if songvideo:
             print("[DEBUG] Downloading as song video")
-            p = await yt_dlp_download(link, type="song_video", format_id=format_id, title=title)
+            p = await yt_dlp_download(
+                link, type="song_video", format_id=format_id, title=title, chat_id=chat_id
+            )
             return (p, True) if p else (None, None)
 
         if songaudio:
             print("[DEBUG] Downloading as song audio")
-            p = await yt_dlp_download(link, type="song_audio", format_id=format_id, title=title)
+            p = await yt_dlp_download(
+                link, type="song_audio", format_id=format_id, title=title, chat_id=chat_id
+            )
             return (p, True) if p else (None, None)
 
         if video:
@@ -247,7 +379,9 @@ class YouTubeAPI:
                     return stream_url, None
                 raise ValueError("Unable to fetch live stream link")
             if await is_on_off(1):
-                p = await yt_dlp_download(link, type="video")
+                p = await yt_dlp_download(
+                    link, type="video", priority=priority, chat_id=chat_id
+                )
                 return (p, True) if p else (None, None)
             stdout, _ = await _exec_proc(
                 "yt-dlp",
@@ -262,5 +396,5 @@ class YouTubeAPI:
             return None, None
 
         print("[DEBUG] Downloading audio only")
-        p = await download_audio_concurrent(link)
+        p = await download_audio_concurrent(link, priority=priority, chat_id=chat_id)
         return (p, True) if p else (None, None)
@@ -1,5 +1,27 @@
+import ast
 import glob
+import importlib
+import time
 from os.path import dirname, isfile
+from typing import Dict, List, Optional, Tuple
+
+from pyrogram import filters
+from pyrogram.handlers import CallbackQueryHandler, MessageHandler
+from pyrogram.types import Message
+
+import config
+from ANNIEMUSIC import LOGGER, app
+
+# Third-party or in-tree imports that make a plugin worth deferring.
+HEAVY_IMPORTS = ("cv2", "PIL", "edge_tts", "lexica", "bs4", "ANNIEMUSIC.utils.font_styles")
+# Heavy plugins that set up clients or state at import time; these are
+# always imported at startup so that work is not paid on a user's command.
+EAGER_PLUGINS = ("tools.ai", "tools.gpt")
+# Stubs get a group of their own so they never shadow a real handler.
+STUB_GROUP = -100
+
+import_times: Dict[str, float] = {}
+deferred: Dict[str, bool] = {}
 
 
 def __list_all_modules():
@@ -17,3 +39,174 @@ def __list_all_modules():
 
 ALL_MODULES = sorted(__list_all_modules())
 __all__ = ALL_MODULES + ["ALL_MODULES"]
+
+
+def _disabled(module: str) -> bool:
+    name = module.strip(".").lower()
+    return name in config.DISABLED_PLUGINS or name.split(".")[0] in config.DISABLED_PLUGINS
+
+
+def _literal(node: ast.AST):
+    try:
+        return ast.literal_eval(node)
+    except Exception:
+        return None
+
+
+def _triggers(path: str) -> Optional[Tuple[List[Tuple[List[str], List[str]]], List[str]]]:
+    """
+    Commands and callback patterns of a heavy plugin whose handlers are all
+    plain ``app.on_message(filters.command(...))`` or
+    ``app.on_callback_query(filters.regex(...))``. Anything else, or a light
+    plugin, returns ``None`` and is imported eagerly.
+    """
+    try:
+        with open(path, encoding="utf-8") as f:
+            tree = ast.parse(f.read())
+    except Exception:
+        return None
+
+    heavy = False
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom):
+            names = [node.module or ""]
+        else:
+            continue
+        heavy = heavy or any(n == h or n.startswith(h + ".") for n in names for h in HEAVY_IMPORTS)
+    if not heavy:
+        return None
+
+    commands: List[Tuple[List[str], List[str]]] = []
+    patterns: List[str] = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Attribute) and node.attr.startswith("on_") and not (
+            isinstance(node.value, ast.Name) and node.value.id == "app"
+        ):
+            return None
+        if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            continue
+        for deco in node.decorator_list:
+            if not (
+                isinstance(deco, ast.Call)
+                and isinstance(deco.func, ast.Attribute)
+                and isinstance(deco.func.value, ast.Name)
+                and deco.func.value.id == "app"
+                and deco.func.attr in ("on_message", "on_callback_query")
+                and deco.args
+            ):
+                return None
+            wanted = "command" if deco.func.attr == "on_message" else "regex"
+            calls = [
+                n
+                for n in ast.walk(deco.args[0])
+                if isinstance(n, ast.Call) and isinstance(n.func, ast.Attribute) and n.func.attr == wanted
+            ]
+            # The trigger must be required outright: not or-ed, not negated.
+            negated = [
+                inner
+                for n in ast.walk(deco.args[0])
+                if isinstance(n, ast.UnaryOp)
+                for inner in ast.walk(n.operand)
+            ]
+            if len(calls) != 1 or calls[0] in negated or any(
+                isinstance(n, ast.BoolOp)
+                or (isinstance(n, ast.BinOp) and not isinstance(n.op, ast.BitAnd))
+                for n in ast.walk(deco.args[0])
+            ):
+                return None
+            call = calls[0]
+            value = _literal(call.args[0]) if call.args else None
+            if wanted == "regex":
+                if not isinstance(value, str):
+                    return None
+                patterns.append(value)
+                continue
+            names = [value] if isinstance(value, str) else value
+            prefixes = next(
+                (_literal(k.value) for k in call.keywords if k.arg == "prefixes"), "/"
+            )
+            if not names or not isinstance(names, list) or prefixes is None:
+                return None
+            commands.append((names, [prefixes] if isinstance(prefixes, str) else prefixes))
+    return (commands, patterns) if commands else None
+
+
+def _import(module: str):
+    started = time.monotonic()
+    mod = importlib.import_module("ANNIEMUSIC.plugins" + module)
+    import_times[module] = time.monotonic() - started
+    return mod
+
+
+def _defer(module: str, commands, patterns) -> None:
+    stubs = []
+
+    async def load(client, update):
+        if deferred.get(module):
+            return
+        deferred[module] = True
+        for handler, group in stubs:
+            client.remove_handler(handler, group)
+
+        # Keep the handlers the plugin registers so this first update can be
+        # handed to them; the dispatcher only sees them from the next one.
+        registered = []
+        add_handler = client.add_handler
+        client.add_handler = lambda handler, group=0: registered.append((handler, group))
+        try:
+            _import(module)
+        except Exception as e:
+            # Put the stubs back so the next use retries the import.
+            for handler, group in stubs:
+                add_handler(handler, group)
+            deferred[module] = False
+            LOGGER(__name__).error(f"Failed to load {module.strip('.')} on first use: {e}")
+            return
+        finally:
+            client.add_handler = add_handler
+        for handler, group in registered:
+            add_handler(handler, group)
+        LOGGER(__name__).info(f"Loaded {module.strip('.')} on first use in {import_times[module]:.2f}s")
+
+        kind = MessageHandler if isinstance(update, Message) else CallbackQueryHandler
+        served = set()
+        for handler, group in sorted(registered, key=lambda pair: pair[1]):
+            if group in served or not isinstance(handler, kind):
+                continue
+            if await handler.check(client, update):
+                served.add(group)
+                await handler.callback(client, update)
+
+    for names, prefixes in commands:
+        stubs.append((MessageHandler(load, filters.command(names, prefixes=prefixes)), STUB_GROUP))
+    for pattern in patterns:
+        stubs.append((CallbackQueryHandler(load, filters.regex(pattern)), STUB_GROUP))
+    for handler, group in stubs:
+        app.add_handler(handler, group)
+    deferred[module] = False
+
+
+def load_plugins() -> Dict[str, int]:
+    """Import, defer or skip every plugin module; returns the counts."""
+    work_dir = dirname(__file__)
+    counts = {"loaded": 0, "deferred": 0, "disabled": 0}
+    for module in ALL_MODULES:
+        if _disabled(module):
+            counts["disabled"] += 1
+            continue
+        triggers = None
+        if config.LAZY_PLUGINS and module.strip(".") not in EAGER_PLUGINS:
+            triggers = _triggers(work_dir + module.replace(".", "/") + ".py")
+        if triggers:
+            _defer(module, *triggers)
+            counts["deferred"] += 1
+        else:
+            _import(module)
+            counts["loaded"] += 1
+    return counts
+
+
+def slowest(limit: int = 5) -> List[Tuple[str, float]]:
+    return sorted(import_times.items(), key=lambda item: item[1], reverse=True)[:limit]
@@ -1,28 +1,75 @@
+import asyncio
+from typing import Dict, List, Optional
+
 from pyrogram.types import (
     InlineKeyboardButton,
     InlineKeyboardMarkup,
     InlineQueryResultPhoto,
 )
-from youtubesearchpython.__future__ import VideosSearch
 
 from ANNIEMUSIC.utils.inlinequery import answer
+from ANNIEMUSIC.utils.meta_cache import MISS, TTLCache, cached_search, youtube_search
+from ANNIEMUSIC.utils.tuning import (
+    INLINE_CACHE_TIME,
+    INLINE_DEBOUNCE,
+    INLINE_MIN_PREFIX,
+    YOUTUBE_META_NEG_TTL,
+    YOUTUBE_META_TTL,
+)
 from config import BANNED_USERS
 from ANNIEMUSIC import app
 
+_answers = TTLCache(512, YOUTUBE_META_TTL, YOUTUBE_META_NEG_TTL)
+_latest: Dict[int, str] = {}
+
+
+def _from_prefix(text: str) -> Optional[List[Dict]]:
+    """
+    Answer a query that extends an earlier one from the earlier results, as
+    long as enough of them still match every typed word.
+    """
+    words = text.split()
+    for end in range(len(text) - 1, INLINE_MIN_PREFIX - 1, -1):
+        items = cached_search(text[:end])
+        if not items:
+            continue
+        hits = [i for i in items if all(w in (i.get("title") or "").lower() for w in words)]
+        return hits if len(hits) >= 5 else None
+    return None
+
 
 @app.on_inline_query(~BANNED_USERS)
 async def inline_query_handler(client, query):
-    text = query.query.strip().lower()
+    text = " ".join(query.query.lower().split())
     answers = []
-    if text.strip() == "":
+    if text == "":
         try:
             await client.answer_inline_query(query.id, results=answer, cache_time=10)
         except:
             return
     else:
-        a = VideosSearch(text, limit=20)
-        result = (await a.next()).get("result")
-        for x in range(15):
+        built = _answers.get(text)
+        if built is not MISS and built is not None:
+            try:
+                return await client.answer_inline_query(
+                    query.id, results=built, cache_time=INLINE_CACHE_TIME
+                )
+            except:
+                return
+        result = _from_prefix(text)
+        if result is None:
+            # Only search once the user pauses; a newer query supersedes this one.
+            user_id = query.from_user.id
+            _latest[user_id] = query.id
+            await asyncio.sleep(INLINE_DEBOUNCE)
+            if _latest.get(user_id) != query.id:
+                return
+            _latest.pop(user_id, None)
+            try:
+                result = await youtube_search(text, limit=20)
+            except Exception:
+                return
+        for x in range(min(15, len(result))):
             title = (result[x]["title"]).title()
             duration = result[x]["duration"]
             views = result[x]["viewCount"]["short"]
@@ -62,7 +109,11 @@ async def inline_query_handler(client, query):
                     reply_markup=buttons,
                 )
             )
+        # Empty answers are a negative entry, so they expire on the short TTL.
+        _answers.set(text, answers or None)
         try:
-            return await client.answer_inline_query(query.id, results=answers)
+            return await client.answer_inline_query(
+                query.id, results=answers, cache_time=INLINE_CACHE_TIME
+            )
         except:
             return
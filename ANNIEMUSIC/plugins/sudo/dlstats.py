@@ -0,0 +1,90 @@
+from pyrogram import filters
+from pyrogram.types import Message
+
+from ANNIEMUSIC import app
+from ANNIEMUSIC.misc import SUDOERS
+from ANNIEMUSIC.utils import janitor, placement
+from ANNIEMUSIC.utils.downloader import backend_stats
+from ANNIEMUSIC.utils.formatters import convert_bytes
+from ANNIEMUSIC.utils.media_cache import media_cache
+from ANNIEMUSIC.utils.meta_cache import youtube_meta
+from ANNIEMUSIC.utils.scheduler import scheduler
+from ANNIEMUSIC.utils.transcode import snapshot as transcode_snapshot
+from ANNIEMUSIC.utils.tuning import TRANSCODE_NATIVE
+
+
+def _backend_lines() -> list:
+    lines = ["<b>ᴅᴏᴡɴʟᴏᴀᴅ ʙᴀᴄᴋᴇɴᴅs</b>"]
+    for name, st in backend_stats().items():
+        lines.append(
+            f"• <code>{name}</code>: wins {st['wins']} | ok {st['success_rate'] * 100:.0f}% "
+            f"| p50 {st['p50']}s | p90 {st['p90']}s | n={st['samples']}"
+        )
+    return lines
+
+
+def _scheduler_lines() -> list:
+    st = scheduler.stats()
+    waiting = ", ".join(f"{k} {v}" for k, v in st["waiting"].items())
+    done = ", ".join(f"{k} {v}" for k, v in st["completed"].items())
+    return [
+        "<b>sᴄʜᴇᴅᴜʟᴇʀ</b>",
+        f"• running {st['running']}/{st['slots']} | cancelled {st['cancelled']}",
+        f"• waiting: {waiting}",
+        f"• completed: {done}",
+    ]
+
+
+def _cache_lines() -> list:
+    st = media_cache.stats()
+    return [
+        "<b>ᴍᴇᴅɪᴀ ᴄᴀᴄʜᴇ</b>",
+        f"• {st['entries']} files | {convert_bytes(st['bytes'])} / {convert_bytes(st['max_bytes'])}",
+        f"• hits {st['hits']} | misses {st['misses']} | evictions {st['evictions']} | pinned {st['referenced']}",
+    ]
+
+
+def _meta_lines() -> list:
+    st = youtube_meta.stats()
+    return [
+        "<b>sᴇᴀʀᴄʜ ᴄᴀᴄʜᴇ</b>",
+        f"• {st['entries']} entries | hits {st['hits']} | negative {st['neg_hits']} | misses {st['misses']}",
+    ]
+
+
+def _transcode_lines() -> list:
+    if not TRANSCODE_NATIVE:
+        return ["<b>ɴᴀᴛɪᴠᴇ ᴛʀᴀɴsᴄᴏᴅᴇ</b>", "• disabled"]
+    st = transcode_snapshot()
+    return [
+        "<b>ɴᴀᴛɪᴠᴇ ᴛʀᴀɴsᴄᴏᴅᴇ</b>",
+        f"• done {st['done']} | skipped {st['skipped']} | failed {st['failed']} | pending {st['pending']}",
+        f"• {st['entries']} files | {convert_bytes(st['bytes'])} / {convert_bytes(st['max_bytes'])}",
+    ]
+
+
+def _janitor_lines() -> list:
+    st = janitor.stats()
+    lines = [f"<b>ᴊᴀɴɪᴛᴏʀ</b> (runs {st['runs']}, last took {st['took']:.2f}s)"]
+    for name, m in st["dirs"].items():
+        lines.append(
+            f"• <code>{name}</code>: {m.get('files', 0)} files | {convert_bytes(m.get('bytes', 0))} "
+            f"| removed {m['removed']} ({convert_bytes(m['freed'])})"
+        )
+    return lines
+
+
+def _assistant_lines() -> list:
+    lines = [f"<b>ᴀssɪsᴛᴀɴᴛs</b> (rebalanced {placement.moved()})"]
+    for number, st in sorted(placement.snapshot().items()):
+        lines.append(
+            f"• <code>{number}</code>: calls {st['calls']} | video {st['video']} | pinned {st['pinned']} "
+            f"| floods {st['floods']} | ping {st['ping']:.0f}ms | score {st['score']:.2f}"
+        )
+    return lines
+
+
+@app.on_message(filters.command(["dlstats"]) & SUDOERS)
+async def download_stats(client, message: Message):
+    sections = [_backend_lines(), _scheduler_lines(), _cache_lines(), _meta_lines(), _transcode_lines(), _janitor_lines(), _assistant_lines()]
+    await message.reply_text("\n\n".join("\n".join(s) for s in sections))
@@ -27,7 +27,9 @@ async def is_heroku():
     return "heroku" in socket.getfqdn()
 
 def cleanup_storage():
-    folders_to_remove = ["downloads", "raw_files", "cache"]
+    # downloads/ and cache/ are kept warm across restarts; the janitor keeps
+    # them inside their quotas.
+    folders_to_remove = ["raw_files"]
     for folder in folders_to_remove:
         try:
             shutil.rmtree(folder)
@@ -0,0 +1,46 @@
+import re
+
+from pyrogram import filters
+from pyrogram.types import Message
+
+from ANNIEMUSIC import Spotify, app
+from ANNIEMUSIC.misc import SUDOERS
+from ANNIEMUSIC.mongo.spotifydb import clear_override, set_override
+from ANNIEMUSIC.utils.meta_cache import video_id_of
+
+_TRACK_ID = re.compile(r"track[/:]([A-Za-z0-9]{22})")
+_BARE_VIDEO_ID = re.compile(r"^[A-Za-z0-9_-]{11}$")
+
+USAGE = (
+    "<b>ᴜsᴀɢᴇ :</b>\n"
+    "/spmap [sᴘᴏᴛɪғʏ ᴛʀᴀᴄᴋ ʟɪɴᴋ] [ʏᴏᴜᴛᴜʙᴇ ʟɪɴᴋ/ɪᴅ]\n"
+    "/spmap [sᴘᴏᴛɪғʏ ᴛʀᴀᴄᴋ ʟɪɴᴋ] clear"
+)
+
+
+@app.on_message(filters.command(["spmap"]) & SUDOERS)
+async def spotify_map_override(client, message: Message):
+    if len(message.command) != 3:
+        return await message.reply_text(USAGE)
+    match = _TRACK_ID.search(message.command[1])
+    if not match:
+        return await message.reply_text(USAGE)
+    track_id, target = match.group(1), message.command[2].strip()
+
+    if target.lower() == "clear":
+        if await clear_override(track_id):
+            return await message.reply_text(f"ᴍᴀᴘᴘɪɴɢ ғᴏʀ <code>{track_id}</code> ʀᴇᴍᴏᴠᴇᴅ.")
+        return await message.reply_text(f"ɴᴏ ᴍᴀᴘᴘɪɴɢ ғᴏʀ <code>{track_id}</code>.")
+
+    vidid = target if _BARE_VIDEO_ID.match(target) else video_id_of(target)
+    if not vidid:
+        return await message.reply_text(USAGE)
+    isrc = None
+    try:
+        isrc = await Spotify.isrc(track_id)
+    except Exception:
+        pass
+    await set_override(track_id, vidid, isrc)
+    await message.reply_text(
+        f"sᴘᴏᴛɪғʏ ᴛʀᴀᴄᴋ <code>{track_id}</code> ɴᴏᴡ ᴘʟᴀʏs <code>{vidid}</code>."
+    )
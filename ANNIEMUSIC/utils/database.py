@@ -1,8 +1,8 @@
-import random
 from typing import Dict, List, Union
 
 from ANNIEMUSIC import userbot
 from ANNIEMUSIC.core.mongo import mongodb
+from ANNIEMUSIC.utils import placement
 
 authdb = mongodb.adminauth
 authuserdb = mongodb.authuser
@@ -45,16 +45,7 @@ async def get_assistant_number(chat_id: int) -> str:
 
 
 async def get_client(assistant: int):
-    if int(assistant) == 1:
-        return userbot.one
-    elif int(assistant) == 2:
-        return userbot.two
-    elif int(assistant) == 3:
-        return userbot.three
-    elif int(assistant) == 4:
-        return userbot.four
-    elif int(assistant) == 5:
-        return userbot.five
+    return userbot.get(assistant)
 
 
 async def set_assistant_new(chat_id, number):
@@ -67,9 +58,7 @@ async def set_assistant_new(chat_id, number):
 
 
 async def set_assistant(chat_id):
-    from ANNIEMUSIC.core.userbot import assistants
-
-    ran_assistant = random.choice(assistants)
+    ran_assistant = placement.pick()
     assistantdict[chat_id] = ran_assistant
     await assdb.update_one(
         {"chat_id": chat_id},
@@ -108,9 +97,7 @@ async def get_assistant(chat_id: int) -> str:
 
 
 async def set_calls_assistant(chat_id):
-    from ANNIEMUSIC.core.userbot import assistants
-
-    ran_assistant = random.choice(assistants)
+    ran_assistant = placement.pick()
     assistantdict[chat_id] = ran_assistant
     await assdb.update_one(
         {"chat_id": chat_id},
@@ -140,16 +127,7 @@ async def group_assistant(self, chat_id: int) -> int:
             assis = assistant
         else:
             assis = await set_calls_assistant(chat_id)
-    if int(assis) == 1:
-        return self.one
-    elif int(assis) == 2:
-        return self.two
-    elif int(assis) == 3:
-        return self.three
-    elif int(assis) == 4:
-        return self.four
-    elif int(assis) == 5:
-        return self.five
+    return self.clients.get(int(assis))
 
 
 async def is_skipmode(chat_id: int) -> bool:
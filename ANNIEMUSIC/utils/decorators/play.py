@@ -3,6 +3,7 @@ import asyncio
 from pyrogram.enums import ChatMemberStatus
 from pyrogram.errors import (
     ChatAdminRequired,
+    FloodWait,
     InviteHashExpired,
     InviteRequestSent,
     UserAlreadyParticipant,
@@ -23,6 +24,7 @@ from ANNIEMUSIC.utils.database import (
     is_active_chat,
     is_maintenance,
 )
+from ANNIEMUSIC.utils import placement
 from ANNIEMUSIC.utils.inline import botplaylist_markup
 
 # Cache for invite links per chat
@@ -207,6 +209,8 @@ def PlayWrapper(command):
                 except UserAlreadyParticipant:
                     pass
                 except Exception as e:
+                    if isinstance(e, FloodWait):
+                        placement.note_flood(chat_id)
                     return await message.reply_text(
                         _["call_3"].format(app.mention, type(e).__name__)
                     )
@@ -1,29 +1,120 @@
 import asyncio
 import contextlib
+import copy
 import os
+import random
 import re
-from typing import Dict, Optional, Union
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Dict, Optional, Set, Tuple, Union
 
 import aiofiles
 import aiohttp
 from aiohttp import TCPConnector
 from yt_dlp import YoutubeDL
+from yt_dlp.utils import DownloadCancelled
 
 from ANNIEMUSIC.core.dir import DOWNLOAD_DIR as _DOWNLOAD_DIR, CACHE_DIR
 from ANNIEMUSIC.utils.cookie_handler import COOKIE_PATH
-from ANNIEMUSIC.utils.tuning import CHUNK_SIZE, SEM
+from ANNIEMUSIC.utils.media_cache import media_cache
+from ANNIEMUSIC.utils.scheduler import NOW_PLAYING, SONG, scheduler
+from ANNIEMUSIC.utils.transcode import submit as submit_transcode
+from ANNIEMUSIC.utils.tuning import (
+    API_DEADLINE,
+    API_POLL_MAX,
+    API_POLL_MIN,
+    CHUNK_SIZE,
+    HEDGE_MAX_DELAY,
+    HEDGE_MIN_DELAY,
+    HEDGE_PERCENTILE,
+    HEDGE_PROBE_RATE,
+    YTDLP_INFO_MAX,
+    YTDLP_INFO_TTL,
+    YTDLP_WORKERS,
+)
 from config import API_KEY, API_URL
 
 USE_API: bool = bool(API_URL and API_KEY)
 
 _COOKIES_FILE = str(COOKIE_PATH)
 
-_inflight: Dict[str, asyncio.Future] = {}
+_inflight: Dict[str, asyncio.Task] = {}
+_waiters: Dict[asyncio.Task, int] = {}
 _inflight_lock = asyncio.Lock()
 
 _session: Optional[aiohttp.ClientSession] = None
 _session_lock = asyncio.Lock()
 
+_info_cache: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+_progress: Dict[str, Dict[str, Any]] = {}
+# Video ids whose yt-dlp download was cancelled; the progress hook stops it.
+_aborted: Set[str] = set()
+_info_lock = threading.Lock()
+
+# Dedicated yt-dlp workers so extraction does not compete with ffprobe, PIL
+# and friends for the default executor. Each thread keeps its own YoutubeDL
+# instances (loaded extractors, cookie jar, player JS cache) alive.
+_ytdlp_pool = ThreadPoolExecutor(max_workers=YTDLP_WORKERS, thread_name_prefix="ytdlp")
+_worker_state = threading.local()
+
+
+class _BackendStats:
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.latencies: deque = deque(maxlen=64)
+        self.outcomes: deque = deque(maxlen=64)
+        self.wins = 0
+
+    def record(self, ok: bool, elapsed: float) -> None:
+        self.outcomes.append(ok)
+        if ok:
+            self.latencies.append(elapsed)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        if len(self.latencies) < 5:
+            return None
+        data = sorted(self.latencies)
+        idx = min(len(data) - 1, int(round(pct / 100 * (len(data) - 1))))
+        return data[idx]
+
+    @property
+    def success_rate(self) -> float:
+        return sum(self.outcomes) / len(self.outcomes) if self.outcomes else 1.0
+
+    def score(self) -> float:
+        """
+        Expected seconds to a usable file; lower is better. Failures count
+        against the success rate, and a backend without enough timings is
+        taken to be as slow as the hedge allows rather than the fastest.
+        """
+        p50 = self.percentile(50)
+        if p50 is None:
+            p50 = HEDGE_MAX_DELAY
+        return p50 / max(self.success_rate, 0.05)
+
+    def snapshot(self) -> Dict[str, Any]:
+        p50 = self.percentile(50)
+        p90 = self.percentile(90)
+        return {
+            "samples": len(self.outcomes),
+            "success_rate": round(self.success_rate, 3),
+            "p50": round(p50, 2) if p50 is not None else None,
+            "p90": round(p90, 2) if p90 is not None else None,
+            "wins": self.wins,
+        }
+
+
+_backends: Dict[str, _BackendStats] = {
+    "api": _BackendStats("api"),
+    "ytdlp": _BackendStats("ytdlp"),
+}
+
+
+def backend_stats() -> Dict[str, Dict[str, Any]]:
+    return {name: b.snapshot() for name, b in _backends.items()}
+
 
 def extract_video_id(link: str) -> str:
     if "v=" in link:
@@ -42,18 +133,54 @@ def _cookiefile_path() -> Optional[str]:
     return None
 
 
-def file_exists(video_id: str) -> Optional[str]:
-    for ext in ("mp3", "m4a", "webm"):
+def file_exists(video_id: str, fmt: str = "audio") -> Optional[str]:
+    cached = media_cache.lookup(video_id, fmt)
+    if cached:
+        return cached
+    exts = ("mp3", "m4a", "webm") if fmt == "audio" else ("mp4",)
+    for ext in exts:
         path = f"{_DOWNLOAD_DIR}/{video_id}.{ext}"
         if os.path.exists(path):
-            return path
+            return media_cache.add(path, fmt)
     return None
 
 
+def _register(path: Optional[str], fmt: str) -> Optional[str]:
+    if not path:
+        return None
+    path = media_cache.add(path, fmt)
+    submit_transcode(path, video=fmt == "video")
+    return path
+
+
 def _safe_filename(name: str) -> str:
     return re.sub(r'[\\/*?:"<>|]+', "_", (name or "").strip())[:200]
 
 
+def _progress_hook(d: Dict[str, Any]) -> None:
+    # Runs on a yt-dlp worker thread; single dict stores are atomic.
+    vid = (d.get("info_dict") or {}).get("id")
+    if not vid:
+        return
+    if vid in _aborted:
+        _progress.pop(vid, None)
+        raise DownloadCancelled()
+    if d.get("status") != "downloading":
+        _progress.pop(vid, None)
+        return
+    _progress[vid] = {
+        "tmp": d.get("tmpfilename"),
+        "final": d.get("filename"),
+        "downloaded": d.get("downloaded_bytes") or 0,
+        "total": d.get("total_bytes") or d.get("total_bytes_estimate"),
+    }
+
+
+def download_progress(video_id: str) -> Optional[Dict[str, Any]]:
+    """Progress of an in-flight yt-dlp download of ``video_id``, if any."""
+    return _progress.get(video_id)
+
+
 def _ytdlp_base_opts() -> Dict[str, Union[str, int, bool]]:
     opts: Dict[str, Union[str, int, bool]] = {
         "outtmpl": f"{_DOWNLOAD_DIR}/%(id)s.%(ext)s",
@@ -69,6 +196,7 @@ def _ytdlp_base_opts() -> Dict[str, Union[str, int, bool]]:
         "retries": 3,
         "fragment_retries": 3,
         "cachedir": str(CACHE_DIR),
+        "progress_hooks": [_progress_hook],
     }
     cookiefile = _cookiefile_path()
     if cookiefile:
@@ -89,107 +217,320 @@ async def _get_session() -> aiohttp.ClientSession:
         return _session
 
 
+def _range_total(header: Optional[str]) -> Optional[int]:
+    """Full size from a ``Content-Range: bytes a-b/total`` header, if known."""
+    total = (header or "").rpartition("/")[2].strip()
+    return int(total) if total.isdigit() else None
+
+
+async def _fetch_body(
+    session: aiohttp.ClientSession, url: str, out_path: str, final: bool
+) -> bool:
+    """
+    Stream ``url`` into ``out_path + '.part'``, resuming from whatever an
+    earlier attempt left behind. Returns True once the file is complete.
+    While the API is still downloading (``final`` False) a response only
+    covers what exists so far, so the file is finished only when a
+    Content-Range total says so.
+    """
+    part = out_path + ".part"
+    offset = os.path.getsize(part) if os.path.exists(part) else 0
+    headers = {"Range": f"bytes={offset}-"} if offset else None
+    async with session.get(url, headers=headers) as fr:
+        total = _range_total(fr.headers.get("Content-Range"))
+        if fr.status == 416 and offset:
+            if final or (total is not None and offset >= total):
+                os.replace(part, out_path)
+                return True
+            return False
+        if fr.status not in (200, 206):
+            return False
+        if fr.status == 200:
+            offset = 0
+        expected = offset + fr.content_length if fr.content_length else None
+        async with aiofiles.open(part, "ab" if offset else "wb") as f:
+            async for chunk in fr.content.iter_chunked(CHUNK_SIZE):
+                if not chunk:
+                    break
+                await f.write(chunk)
+    size = os.path.getsize(part)
+    if total is not None:
+        complete = size >= total
+    elif final:
+        complete = size > 0 and (expected is None or size >= expected)
+    else:
+        complete = False
+    if complete:
+        os.replace(part, out_path)
+        return True
+    return False
+
+
+async def _api_poll(vid: str) -> Optional[str]:
+    poll_url = f"{API_URL}/song/{vid}?api={API_KEY}"
+    session = await _get_session()
+    delay = API_POLL_MIN
+    while True:
+        async with session.get(poll_url) as r:
+            if r.status != 200:
+                return None
+            data = await r.json()
+        s = str(data.get("status", "")).lower()
+        if s not in ("done", "downloading"):
+            return None
+        dl = data.get("link")
+        if s == "done" and not dl:
+            return None
+        if dl:
+            fmt = str(data.get("format", "mp3")).lower()
+            out_path = f"{_DOWNLOAD_DIR}/{vid}.{fmt}"
+            with contextlib.suppress(aiohttp.ClientError, asyncio.TimeoutError):
+                if await _fetch_body(session, dl, out_path, final=s == "done"):
+                    return out_path
+        # Exponential backoff with equal jitter.
+        await asyncio.sleep(random.uniform(delay / 2, delay))
+        delay = min(delay * 2, API_POLL_MAX)
+
+
 async def api_download_song(link: str) -> Optional[str]:
     if not USE_API:
         return None
     vid = extract_video_id(link)
-    poll_url = f"{API_URL}/song/{vid}?api={API_KEY}"
     try:
-        session = await _get_session()
-        while True:
-            async with session.get(poll_url) as r:
-                if r.status != 200:
-                    return None
-                data = await r.json()
-                s = str(data.get("status", "")).lower()
-                if s == "downloading":
-                    await asyncio.sleep(1.5)
-                    continue
-                if s != "done":
-                    return None
-                dl = data.get("link")
-                fmt = str(data.get("format", "mp3")).lower()
-                out_path = f"{_DOWNLOAD_DIR}/{vid}.{fmt}"
-                async with session.get(dl) as fr:
-                    if fr.status != 200:
-                        return None
-                    async with aiofiles.open(out_path, "wb") as f:
-                        async for chunk in fr.content.iter_chunked(CHUNK_SIZE):
-                            if not chunk:
-                                break
-                            await f.write(chunk)
-                return out_path
+        out_path = await asyncio.wait_for(_api_poll(vid), timeout=API_DEADLINE)
+    except Exception:
+        return None
+    return _register(out_path, "audio")
+
+
+def _cached_info(link: str) -> Optional[Dict[str, Any]]:
+    with _info_lock:
+        hit = _info_cache.get(link)
+        if not hit:
+            return None
+        ts, info = hit
+        if time.time() - ts > YTDLP_INFO_TTL:
+            _info_cache.pop(link, None)
+            return None
+        return info
+
+
+def _store_info(link: str, info: Dict[str, Any]) -> None:
+    with _info_lock:
+        if len(_info_cache) >= YTDLP_INFO_MAX:
+            oldest = min(_info_cache, key=lambda k: _info_cache[k][0])
+            _info_cache.pop(oldest, None)
+        _info_cache[link] = (time.time(), info)
+
+
+def _extract_ytdlp(ydl: YoutubeDL, link: str) -> Dict[str, Any]:
+    info = _cached_info(link)
+    if info is None:
+        # Unprocessed result: format selection happens per caller, so one
+        # extraction serves audio, video and /song downloads alike.
+        info = ydl.extract_info(link, download=False, process=False)
+        if info.get("_type") == "url" and info.get("url"):
+            info = ydl.extract_info(info["url"], download=False, process=False)
+        _store_info(link, info)
+    return info
+
+
+def _warm_ydl(profile: str, opts: Dict) -> YoutubeDL:
+    ydls = getattr(_worker_state, "ydls", None)
+    if ydls is None:
+        ydls = _worker_state.ydls = {}
+    key = (profile, opts.get("cookiefile"))
+    ydl = ydls.get(key)
+    if ydl is None:
+        ydl = ydls[key] = YoutubeDL(opts)
+    return ydl
+
+
+def _process_ytdlp(link: str, opts: Dict, profile: Optional[str] = None) -> Dict[str, Any]:
+    if profile:
+        ydl = _warm_ydl(profile, opts)
+        info = _extract_ytdlp(ydl, link)
+        return ydl.process_ie_result(copy.deepcopy(info), download=True)
+    with YoutubeDL(opts) as ydl:
+        info = _extract_ytdlp(ydl, link)
+        return ydl.process_ie_result(copy.deepcopy(info), download=True)
+
+
+async def run_ytdlp(func, *args):
+    job = _ytdlp_pool.submit(func, *args)
+    fut = asyncio.wrap_future(job)
+    try:
+        return await asyncio.shield(fut)
+    except asyncio.CancelledError:
+        # A running worker cannot be interrupted; wait for it to stop so the
+        # caller does not hand its slot on while the thread is still busy.
+        if not job.cancel():
+            await asyncio.wait({fut})
+            with contextlib.suppress(BaseException):
+                fut.result()
+        raise
+
+
+def _download_ytdlp(link: str, opts: Dict, profile: Optional[str] = None) -> Optional[str]:
+    try:
+        result = _process_ytdlp(link, opts, profile)
+        downloads = result.get("requested_downloads") or [{}]
+        path = downloads[0].get("filepath") or result.get("filepath")
+        if not path:
+            path = f"{_DOWNLOAD_DIR}/{result.get('id')}.{result.get('ext') or 'webm'}"
+        return path if os.path.exists(path) else None
     except Exception:
         return None
 
 
-def _download_ytdlp(link: str, opts: Dict) -> Optional[str]:
+async def extract_info(link: str) -> Optional[Dict[str, Any]]:
+    cached = _cached_info(link)
+    if cached is not None:
+        return cached
+
+    def _run():
+        return _extract_ytdlp(_warm_ydl("base", _ytdlp_base_opts()), link)
+
     try:
-        with YoutubeDL(opts) as ydl:
-            info = ydl.extract_info(link, download=False)
-            ext = info.get("ext") or "webm"
-            vid = info.get("id")
-            path = f"{_DOWNLOAD_DIR}/{vid}.{ext}"
-            if os.path.exists(path):
-                return path
-            ydl.download([link])
-            return path
+        return await run_ytdlp(_run)
     except Exception:
         return None
 
 
-async def _with_sem(coro):
-    async with SEM:
-        return await coro
+async def iter_playlist(link: str, limit: int) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Flat playlist entries as yt-dlp pages them in. Entries carry id, title,
+    duration and thumbnails from the listing itself; no video is resolved.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    stop = threading.Event()
+    done = object()
+
+    def _put(item) -> None:
+        with contextlib.suppress(RuntimeError):
+            loop.call_soon_threadsafe(queue.put_nowait, item)
+
+    def _run() -> None:
+        try:
+            ydl = _warm_ydl("base", _ytdlp_base_opts())
+            info = ydl.extract_info(link, download=False, process=False)
+            if info.get("_type") in ("url", "url_transparent") and info.get("url"):
+                info = ydl.extract_info(info["url"], download=False, process=False)
+            # Unprocessed, "entries" is the extractor's page generator.
+            for count, entry in enumerate(info.get("entries") or []):
+                if stop.is_set() or count >= limit:
+                    break
+                if entry and entry.get("id"):
+                    _put(entry)
+        except Exception as e:
+            _put(e)
+        finally:
+            _put(done)
+
+    loop.run_in_executor(_ytdlp_pool, _run)
+    try:
+        while True:
+            item = await queue.get()
+            if item is done:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+
+
+async def _in_slot(coro, link: str, priority: int, chat_id: Optional[int]):
+    try:
+        async with scheduler.slot(priority, chat_id, key=link):
+            task = asyncio.ensure_future(coro)
+            try:
+                return await asyncio.shield(task)
+            except asyncio.CancelledError:
+                # Hold the slot until the work has actually stopped; yt-dlp
+                # notices the abort at its next progress hook.
+                vid = extract_video_id(link)
+                _aborted.add(vid)
+                task.cancel()
+                try:
+                    await asyncio.wait({task})
+                finally:
+                    _aborted.discard(vid)
+                with contextlib.suppress(BaseException):
+                    task.result()
+                raise
+    finally:
+        coro.close()
 
 
-async def _dedup(key: str, runner):
-    async with _inflight_lock:
-        fut = _inflight.get(key)
-        if fut:
-            return await fut
-        fut = asyncio.get_running_loop().create_future()
-        _inflight[key] = fut
+async def _run_inflight(key: str, runner):
     try:
-        res = await runner()
-        fut.set_result(res)
-        return res
-    except Exception:
-        fut.set_result(None)
+        return await runner()
+    except (Exception, asyncio.CancelledError):
         return None
     finally:
-        async with _inflight_lock:
-            _inflight.pop(key, None)
+        _inflight.pop(key, None)
+
+
+async def _dedup(key: str, runner, link: Optional[str] = None, priority: Optional[int] = None):
+    async with _inflight_lock:
+        task = _inflight.get(key)
+        if task and link and priority is not None:
+            scheduler.promote(link, priority)
+        if not task:
+            task = asyncio.create_task(_run_inflight(key, runner))
+            _inflight[key] = task
+        _waiters[task] = _waiters.get(task, 0) + 1
+    try:
+        return await asyncio.shield(task)
+    except asyncio.CancelledError:
+        # Only abandon the download when nobody else is waiting for it.
+        if _waiters.get(task, 0) <= 1 and not task.done():
+            task.cancel()
+        raise
+    finally:
+        _waiters[task] -= 1
+        if _waiters[task] <= 0:
+            _waiters.pop(task, None)
 
 
 async def yt_dlp_download(
-    link: str, type: str, format_id: str = None, title: str = None
+    link: str,
+    type: str,
+    format_id: str = None,
+    title: str = None,
+    priority: int = NOW_PLAYING,
+    chat_id: Optional[int] = None,
 ) -> Optional[str]:
-    loop = asyncio.get_running_loop()
-
     if type == "audio":
         key = f"a:{link}"
 
         async def run():
             opts = _ytdlp_base_opts()
             opts.update({"format": "bestaudio/best"})
-            return await _with_sem(
-                loop.run_in_executor(None, _download_ytdlp, link, opts)
+            path = await _in_slot(
+                run_ytdlp(_download_ytdlp, link, opts, "audio"), link, priority, chat_id
             )
+            return _register(path, "audio")
 
-        return await _dedup(key, run)
+        return await _dedup(key, run, link, priority)
 
     if type == "video":
+        cached = file_exists(extract_video_id(link), "video")
+        if cached:
+            return cached
         key = f"v:{link}"
 
         async def run():
             opts = _ytdlp_base_opts()
             opts.update({"format": "best[height<=?720][width<=?1280]"})
-            return await _with_sem(
-                loop.run_in_executor(None, _download_ytdlp, link, opts)
+            path = await _in_slot(
+                run_ytdlp(_download_ytdlp, link, opts, "video"), link, priority, chat_id
             )
+            return _register(path, "video")
 
-        return await _dedup(key, run)
+        return await _dedup(key, run, link, priority)
 
     if type == "song_video" and format_id and title:
         safe_title = _safe_filename(title)
@@ -205,12 +546,10 @@ async def yt_dlp_download(
                     "merge_output_format": "mp4",
                 }
             )
-            await _with_sem(
-                loop.run_in_executor(None, lambda: YoutubeDL(opts).download([link]))
-            )
+            await _in_slot(run_ytdlp(_process_ytdlp, link, opts), link, SONG, chat_id)
             return f"{_DOWNLOAD_DIR}/{safe_title}.mp4"
 
-        return await _dedup(key, run)
+        return await _dedup(key, run, link, SONG)
 
     if type == "song_audio" and format_id and title:
         safe_title = _safe_filename(title)
@@ -232,47 +571,79 @@ async def yt_dlp_download(
                     ],
                 }
             )
-            await _with_sem(
-                loop.run_in_executor(None, lambda: YoutubeDL(opts).download([link]))
-            )
+            await _in_slot(run_ytdlp(_process_ytdlp, link, opts), link, SONG, chat_id)
             return f"{_DOWNLOAD_DIR}/{safe_title}.mp3"
 
-        return await _dedup(key, run)
+        return await _dedup(key, run, link, SONG)
 
     return None
 
 
-async def download_audio_concurrent(link: str) -> Optional[str]:
+async def download_audio_concurrent(
+    link: str, priority: int = NOW_PLAYING, chat_id: Optional[int] = None
+) -> Optional[str]:
     vid = extract_video_id(link)
     cached = file_exists(vid)
     if cached:
         return cached
 
     if not USE_API:
-        return await yt_dlp_download(link, type="audio")
+        return await yt_dlp_download(link, type="audio", priority=priority, chat_id=chat_id)
 
     key = f"rac:{link}"
 
+    runners = {
+        "ytdlp": lambda: yt_dlp_download(
+            link, type="audio", priority=priority, chat_id=chat_id
+        ),
+        "api": lambda: _in_slot(api_download_song(link), link, priority, chat_id),
+    }
+
+    async def timed(name: str):
+        start = time.monotonic()
+        res = None
+        try:
+            res = await runners[name]()
+            return res
+        finally:
+            # A hedged loser is cancelled; it still counts as not delivering.
+            _backends[name].record(bool(res), time.monotonic() - start)
+
     async def run():
-        yt_task = asyncio.create_task(yt_dlp_download(link, type="audio"))
-        api_task = asyncio.create_task(api_download_song(link))
-        done, pending = await asyncio.wait(
-            {yt_task, api_task}, return_when=asyncio.FIRST_COMPLETED
-        )
+        # Hedged request: start the historically better backend, and only
+        # fire the other one if the first is slower than its usual p-tile.
+        primary, secondary = sorted(_backends, key=lambda n: _backends[n].score())
+        if random.random() < HEDGE_PROBE_RATE:
+            primary, secondary = secondary, primary
+        delay = _backends[primary].percentile(HEDGE_PERCENTILE) or HEDGE_MAX_DELAY
+        delay = min(max(delay, HEDGE_MIN_DELAY), HEDGE_MAX_DELAY)
+
+        tasks = {asyncio.create_task(timed(primary)): primary}
+        done, _ = await asyncio.wait(set(tasks), timeout=delay)
         for t in done:
             with contextlib.suppress(Exception):
-                res = t.result()
-                if res:
-                    for p in pending:
-                        p.cancel()
-                        with contextlib.suppress(Exception, asyncio.CancelledError):
-                            await p
-                    return res
-        for t in pending:
-            with contextlib.suppress(Exception, asyncio.CancelledError):
-                res = await t
-                if res:
-                    return res
-        return None
-
-    return await _dedup(key, lambda: _with_sem(run()))
+                if t.result():
+                    _backends[primary].wins += 1
+                    return t.result()
+        tasks[asyncio.create_task(timed(secondary))] = secondary
+
+        pending = {t for t in tasks if not t.done()}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for t in done:
+                    with contextlib.suppress(Exception):
+                        res = t.result()
+                        if res:
+                            _backends[tasks[t]].wins += 1
+                            return res
+            return None
+        finally:
+            for p in pending:
+                p.cancel()
+                with contextlib.suppress(Exception, asyncio.CancelledError):
+                    await p
+
+    return await _dedup(key, run, link, priority)
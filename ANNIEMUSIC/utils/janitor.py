@@ -0,0 +1,186 @@
+import asyncio
+import os
+import time
+from typing import Dict, List, Set, Tuple
+
+from ANNIEMUSIC.core.dir import CACHE_DIR, COUPLE_DIR
+from ANNIEMUSIC.logging import LOGGER
+from ANNIEMUSIC.misc import db
+from ANNIEMUSIC.utils.media_cache import INDEX_NAME, MediaCache, media_cache
+from ANNIEMUSIC.utils.transcode import NATIVE_DIR, native_cache
+from ANNIEMUSIC.utils.tuning import (
+    CACHE_DIR_MAX_AGE,
+    CACHE_DIR_MAX_BYTES,
+    COUPLES_MAX_AGE,
+    COUPLES_MAX_BYTES,
+    DOWNLOADS_STRAY_MAX_AGE,
+    JANITOR_GRACE,
+    JANITOR_INTERVAL,
+    PLAYBACK_MAX_AGE,
+    PLAYBACK_MAX_BYTES,
+)
+
+PLAYBACK_DIR = os.path.abspath("playback")
+
+# name -> (root, byte quota, max age in seconds)
+POLICIES: Dict[str, Tuple[str, int, int]] = {
+    "cache": (CACHE_DIR, CACHE_DIR_MAX_BYTES, CACHE_DIR_MAX_AGE),
+    "playback": (PLAYBACK_DIR, PLAYBACK_MAX_BYTES, PLAYBACK_MAX_AGE),
+    "couples": (COUPLE_DIR, COUPLES_MAX_BYTES, COUPLES_MAX_AGE),
+}
+
+_metrics: Dict[str, Dict[str, float]] = {}
+_last_run: Dict[str, float] = {"at": 0.0, "took": 0.0, "runs": 0}
+
+
+def _live_refs() -> Tuple[Set[str], Set[str]]:
+    """Absolute paths and media ids referenced by any live queue."""
+    paths: Set[str] = set()
+    ids: Set[str] = set()
+    for queue in list(db.values()):
+        for entry in queue or []:
+            vidid = entry.get("vidid")
+            if vidid:
+                ids.add(str(vidid))
+            path = str(entry.get("file") or "")
+            if os.path.isabs(path):
+                paths.add(os.path.abspath(path))
+                ids.add(os.path.basename(path).rpartition(".")[0])
+    return paths, ids
+
+
+def _protected(path: str, paths: Set[str], ids: Set[str], now: float) -> bool:
+    if path in paths or media_cache.is_referenced(path):
+        return True
+    name = os.path.basename(path)
+    if any(i and i in name for i in ids):
+        return True
+    try:
+        # Anything touched very recently may still be written.
+        return now - os.path.getmtime(path) < JANITOR_GRACE
+    except OSError:
+        return True
+
+
+def _scan(root: str) -> List[Tuple[str, int, float]]:
+    files = []
+    for base, _, names in os.walk(root):
+        for name in names:
+            path = os.path.join(base, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            files.append((path, st.st_size, max(st.st_atime, st.st_mtime)))
+    return files
+
+
+def _remove(path: str) -> bool:
+    try:
+        os.remove(path)
+        return True
+    except FileNotFoundError:
+        return True
+    except OSError as e:
+        LOGGER(__name__).warning(f"Janitor failed to remove {path}: {e}")
+        return False
+
+
+def _sweep_dir(name: str, root: str, quota: int, max_age: int, refs, now: float) -> None:
+    paths, ids = refs
+    files = sorted(_scan(root), key=lambda f: f[2])
+    total = sum(f[1] for f in files)
+    removed = freed = 0
+    for path, size, last in files:
+        over_age = max_age > 0 and now - last > max_age
+        over_quota = quota > 0 and total > quota
+        if not (over_age or over_quota):
+            continue
+        if _protected(os.path.abspath(path), paths, ids, now):
+            continue
+        if _remove(path):
+            total -= size
+            freed += size
+            removed += 1
+    _record(name, total, len(files) - removed, removed, freed)
+
+
+def _sweep_strays(cache: MediaCache, refs, now: float) -> Tuple[int, int]:
+    """Drop files in a managed directory that its cache does not know about."""
+    paths, ids = refs
+    removed = freed = 0
+    try:
+        names = os.listdir(cache.root)
+    except OSError:
+        names = []
+    for fname in names:
+        path = os.path.abspath(os.path.join(cache.root, fname))
+        if fname.startswith(INDEX_NAME) or not os.path.isfile(path) or cache.is_managed(path):
+            continue
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        if now - max(st.st_atime, st.st_mtime) < DOWNLOADS_STRAY_MAX_AGE:
+            continue
+        if _protected(path, paths, ids, now):
+            continue
+        if _remove(path):
+            removed += 1
+            freed += st.st_size
+    return removed, freed
+
+
+def _record(name: str, size: int, files: int, removed: int, freed: int) -> None:
+    m = _metrics.setdefault(name, {"removed": 0, "freed": 0})
+    m["bytes"] = size
+    m["files"] = files
+    m["removed"] += removed
+    m["freed"] += freed
+
+
+def _managed() -> Dict[str, MediaCache]:
+    caches = {"downloads": media_cache}
+    if os.path.isdir(NATIVE_DIR):
+        caches["native"] = native_cache
+    return caches
+
+
+def _sweep_disk(refs, now: float) -> Dict[str, Tuple[int, int]]:
+    stray = {name: _sweep_strays(cache, refs, now) for name, cache in _managed().items()}
+    for name, (root, quota, max_age) in POLICIES.items():
+        if os.path.isdir(root):
+            _sweep_dir(name, root, quota, max_age, refs, now)
+    return stray
+
+
+async def sweep() -> Dict[str, Dict[str, float]]:
+    """One pass over every directory the bot writes media into."""
+    start = time.monotonic()
+    now = time.time()
+    # Cache indexes and queues are only touched on the loop; the directory
+    # walks, which only read them, run on a worker thread.
+    refs = _live_refs()
+    budget = {name: cache.evict() for name, cache in _managed().items()}
+    stray = await asyncio.to_thread(_sweep_disk, refs, now)
+    for name, cache in _managed().items():
+        removed, freed = stray.get(name, (0, 0))
+        st = cache.stats()
+        _record(name, st["bytes"], st["entries"], removed, freed + budget.get(name, 0))
+    _last_run.update(at=now, took=time.monotonic() - start, runs=_last_run["runs"] + 1)
+    return _metrics
+
+
+async def run() -> None:
+    if JANITOR_INTERVAL <= 0:
+        return
+    while True:
+        try:
+            await sweep()
+        except Exception as e:
+            LOGGER(__name__).warning(f"Janitor pass failed: {e}")
+        await asyncio.sleep(JANITOR_INTERVAL)
+
+
+def stats() -> Dict[str, object]:
+    return {"dirs": dict(_metrics), **_last_run}
@@ -0,0 +1,226 @@
+import asyncio
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from ANNIEMUSIC.core.dir import DOWNLOAD_DIR
+from ANNIEMUSIC.logging import LOGGER
+from ANNIEMUSIC.utils.tuning import MEDIA_CACHE_FLUSH_DELAY, MEDIA_CACHE_MAX_BYTES
+
+INDEX_NAME = ".media_index.json"
+
+# Only used for files the index does not know; .webm can hold either format,
+# so an unindexed one is left alone rather than guessed.
+AUDIO_EXTS = ("mp3", "m4a", "opus", "ogg")
+VIDEO_EXTS = ("mp4", "mkv")
+
+
+def _norm(path: str) -> str:
+    return os.path.abspath(path)
+
+
+class MediaCache:
+    """
+    Disk-budgeted cache for downloaded tracks.
+
+    Entries are keyed by ``<media id>:<audio|video>`` and kept in LRU order.
+    Files referenced by a queued or playing entry are never evicted.
+    """
+
+    def __init__(self, root: str, max_bytes: int) -> None:
+        self.root = root
+        self.max_bytes = max_bytes
+        self.index_file = os.path.join(root, INDEX_NAME)
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self._by_path: Dict[str, str] = {}
+        self._refs: Dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+
+    @staticmethod
+    def key(media_id: str, fmt: str = "audio") -> str:
+        return f"{media_id}:{fmt}"
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(e["size"] for e in self._entries.values())
+
+    def _track(self, key: str, path: str, size: int, atime: float, fmt: str) -> None:
+        old = self._entries.pop(key, None)
+        if old and old["path"] != path:
+            self._by_path.pop(old["path"], None)
+        self._entries[key] = {"path": path, "size": size, "atime": atime, "fmt": fmt}
+        self._by_path[path] = key
+
+    def _untrack(self, key: str) -> Optional[Dict]:
+        entry = self._entries.pop(key, None)
+        if entry:
+            self._by_path.pop(entry["path"], None)
+        return entry
+
+    def rebuild(self) -> int:
+        """Reload the on-disk index and reconcile it with the files present."""
+        self._entries.clear()
+        self._by_path.clear()
+        os.makedirs(self.root, exist_ok=True)
+        saved: Dict[str, Dict] = {}
+        try:
+            with open(self.index_file, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            saved = {}
+
+        for key, entry in saved.items():
+            path = _norm(os.path.join(self.root, entry.get("file", "")))
+            # The format recorded at download time; older indexes only have
+            # it as the key suffix.
+            fmt = entry.get("fmt") or key.rpartition(":")[2] or "audio"
+            if os.path.isfile(path):
+                self._track(key, path, os.path.getsize(path), float(entry.get("atime", 0)), fmt)
+
+        try:
+            names = os.listdir(self.root)
+        except OSError:
+            names = []
+        for name in names:
+            path = _norm(os.path.join(self.root, name))
+            if path in self._by_path or not os.path.isfile(path):
+                continue
+            stem, _, ext = name.rpartition(".")
+            ext = ext.lower()
+            if not stem or ext not in AUDIO_EXTS + VIDEO_EXTS:
+                continue
+            fmt = "video" if ext in VIDEO_EXTS else "audio"
+            st = os.stat(path)
+            self._track(self.key(stem, fmt), path, st.st_size, st.st_mtime, fmt)
+
+        ordered = sorted(self._entries.items(), key=lambda kv: kv[1]["atime"])
+        self._entries = OrderedDict(ordered)
+        self.evict()
+        self.flush()
+        return len(self._entries)
+
+    def flush(self) -> None:
+        if self._flush_handle:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        data = {
+            key: {
+                "file": os.path.basename(e["path"]),
+                "fmt": e["fmt"],
+                "size": e["size"],
+                "atime": e["atime"],
+            }
+            for key, e in self._entries.items()
+        }
+        tmp = self.index_file + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp, self.index_file)
+        except OSError as e:
+            LOGGER(__name__).warning(f"Failed to write media index: {e}")
+
+    def lookup(self, media_id: str, fmt: str = "audio") -> Optional[str]:
+        key = self.key(media_id, fmt)
+        entry = self._entries.get(key)
+        if entry and os.path.isfile(entry["path"]):
+            entry["atime"] = time.time()
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry["path"]
+        if entry:
+            self._untrack(key)
+        self.misses += 1
+        return None
+
+    def add(self, path: str, fmt: str = "audio") -> str:
+        path = _norm(path)
+        if not os.path.isfile(path):
+            return path
+        media_id = os.path.basename(path).rpartition(".")[0]
+        key = self.key(media_id, fmt)
+        self._track(key, path, os.path.getsize(path), time.time(), fmt)
+        self.evict(keep=key)
+        self._schedule_flush()
+        return path
+
+    def _schedule_flush(self) -> None:
+        """Batch index writes: a burst of downloads costs one JSON dump."""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush()
+            return
+        if MEDIA_CACHE_FLUSH_DELAY <= 0:
+            self.flush()
+        elif not self._flush_handle:
+            self._flush_handle = loop.call_later(MEDIA_CACHE_FLUSH_DELAY, self.flush)
+
+    def is_managed(self, path: str) -> bool:
+        return bool(path) and _norm(path) in self._by_path
+
+    def is_referenced(self, path: str) -> bool:
+        return self._refs.get(_norm(path), 0) > 0
+
+    def acquire(self, path: str) -> None:
+        if not path or not isinstance(path, str) or not os.path.isabs(path):
+            return
+        path = _norm(path)
+        self._refs[path] = self._refs.get(path, 0) + 1
+        key = self._by_path.get(path)
+        if key:
+            self._entries[key]["atime"] = time.time()
+            self._entries.move_to_end(key)
+
+    def release(self, path: str) -> None:
+        if not path or not isinstance(path, str):
+            return
+        path = _norm(path)
+        count = self._refs.get(path, 0) - 1
+        if count > 0:
+            self._refs[path] = count
+        else:
+            self._refs.pop(path, None)
+
+    def evict(self, target: Optional[int] = None, keep: Optional[str] = None) -> int:
+        budget = self.max_bytes if target is None else target
+        total = self.total_bytes
+        freed = 0
+        for key in list(self._entries.keys()):
+            if total <= budget:
+                break
+            entry = self._entries[key]
+            # ``keep`` was just added and is about to be handed out.
+            if key == keep or self._refs.get(entry["path"], 0) > 0:
+                continue
+            try:
+                os.remove(entry["path"])
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                LOGGER(__name__).warning(f"Failed to evict {entry['path']}: {e}")
+                continue
+            self._untrack(key)
+            total -= entry["size"]
+            freed += entry["size"]
+            self.evictions += 1
+        return freed
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "referenced": len(self._refs),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+media_cache = MediaCache(DOWNLOAD_DIR, MEDIA_CACHE_MAX_BYTES)
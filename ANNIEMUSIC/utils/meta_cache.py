@@ -0,0 +1,169 @@
+import asyncio
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from youtubesearchpython.__future__ import VideosSearch
+
+from ANNIEMUSIC.logging import LOGGER
+from ANNIEMUSIC.mongo import trackdb
+from ANNIEMUSIC.utils.tuning import (
+    YOUTUBE_META_MAX,
+    YOUTUBE_META_NEG_TTL,
+    YOUTUBE_META_TTL,
+)
+
+MISS = object()
+_VIDEO_ID = re.compile(r"(?:v=|youtu\.be/|shorts/|live/|embed/)([A-Za-z0-9_-]{11})")
+
+
+class TTLCache:
+    """
+    Bounded LRU where every entry carries its own expiry. Negative entries
+    (a lookup that found nothing) live for a shorter ``neg_ttl``.
+    """
+
+    def __init__(self, max_size: int, ttl: float, neg_ttl: float) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self.neg_ttl = neg_ttl
+        self._data: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.neg_hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Any:
+        """The cached value, ``None`` for a negative entry, or ``MISS``."""
+        item = self._data.get(key)
+        if item is None:
+            self.misses += 1
+            return MISS
+        expires, value = item
+        if expires < time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return MISS
+        self._data.move_to_end(key)
+        if value is None:
+            self.neg_hits += 1
+        else:
+            self.hits += 1
+        return value
+
+    def peek(self, key: str) -> Any:
+        """Like ``get`` but leaves recency and the hit counters alone."""
+        item = self._data.get(key)
+        if item is None or item[0] < time.monotonic():
+            return MISS
+        return item[1]
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        if ttl is None:
+            ttl = self.neg_ttl if value is None else self.ttl
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._data),
+            "hits": self.hits,
+            "neg_hits": self.neg_hits,
+            "misses": self.misses,
+        }
+
+
+youtube_meta = TTLCache(YOUTUBE_META_MAX, YOUTUBE_META_TTL, YOUTUBE_META_NEG_TTL)
+_inflight: Dict[str, asyncio.Task] = {}
+
+
+def video_id_of(query: str) -> Optional[str]:
+    match = _VIDEO_ID.search(query or "")
+    return match.group(1) if match else None
+
+
+def _normalize(query: str) -> str:
+    return " ".join((query or "").lower().split())
+
+
+def remember(items: List[Dict]) -> None:
+    for item in items:
+        vid = item.get("id")
+        if vid:
+            youtube_meta.set(f"v:{vid}", item)
+
+
+def cached_search(query: str) -> Optional[List[Dict]]:
+    """
+    Items of an earlier text search for ``query``, without going out. A
+    probe: it neither counts as a hit or miss nor refreshes the entry.
+    """
+    hit = youtube_meta.peek(f"q:{_normalize(query)}")
+    if hit is MISS or hit is None:
+        return None
+    return hit["items"]
+
+
+async def _search(query: str, limit: int) -> List[Dict]:
+    try:
+        data = await VideosSearch(query, limit=limit).next()
+        return data.get("result") or []
+    except Exception as e:
+        LOGGER(__name__).warning(f"VideosSearch failed for {query}: {e}")
+        raise
+
+
+async def _resolve(query: str, vid: Optional[str], limit: int) -> List[Dict]:
+    # Single-result lookups are what /play and the resolvers issue; those are
+    # read through the persistent store so a fresh process skips the search.
+    if limit != 1:
+        return await _search(query, limit)
+    norm = _normalize(query)
+    stored = await (trackdb.get_track(vid) if vid else trackdb.get_query(norm))
+    if stored:
+        return [stored]
+    items = await _search(query, limit)
+    if items:
+        asyncio.create_task(trackdb.save_track(items[0], None if vid else norm))
+    return items
+
+
+async def _lookup(query: str, vid: Optional[str], key: str, limit: int) -> List[Dict]:
+    items = await _resolve(query, vid, limit)
+    remember(items)
+    if vid:
+        # Under the requested id too, even if the search led with another video.
+        youtube_meta.set(key, items[0] if items else None)
+    elif items:
+        youtube_meta.set(key, {"limit": limit, "items": items})
+    else:
+        youtube_meta.set(key, None)
+    return items
+
+
+async def youtube_search(query: str, limit: int = 1) -> List[Dict]:
+    """
+    Cached VideosSearch. A video URL is keyed by its id so that /play,
+    thumbnails and inline answers share one lookup.
+    """
+    vid = video_id_of(query)
+    key = f"v:{vid}" if vid else f"q:{_normalize(query)}"
+    hit = youtube_meta.get(key)
+    if hit is None:
+        return []
+    if hit is not MISS:
+        if vid:
+            return [hit]
+        # A wider earlier search, or one that came back short, covers this one.
+        if hit["limit"] >= limit or len(hit["items"]) < hit["limit"]:
+            return hit["items"][:limit]
+
+    flight = f"{key}:{limit}"
+    task = _inflight.get(flight)
+    if not task:
+        # Shared, so a caller that gives up does not fail the others.
+        task = _inflight[flight] = asyncio.create_task(_lookup(query, vid, key, limit))
+        task.add_done_callback(lambda _: _inflight.pop(flight, None))
+    return (await asyncio.shield(task))[:limit]
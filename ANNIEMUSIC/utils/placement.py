@@ -0,0 +1,143 @@
+import asyncio
+import random
+import time
+from collections import deque
+from typing import Deque, Dict, Optional
+
+import config
+from ANNIEMUSIC.logging import LOGGER
+from ANNIEMUSIC.utils.tuning import (
+    PLACEMENT_FLOOD_WINDOW,
+    PLACEMENT_W_CALL,
+    PLACEMENT_W_FLOOD,
+    PLACEMENT_W_PING,
+    PLACEMENT_W_PINNED,
+    PLACEMENT_W_VIDEO,
+    REBALANCE_BATCH,
+    REBALANCE_GAP,
+    REBALANCE_INTERVAL,
+)
+
+_floods: Dict[int, Deque[float]] = {}
+_moved = 0
+
+
+def note_flood(chat_id: int) -> None:
+    """Count a FloodWait against the assistant serving ``chat_id``."""
+    from ANNIEMUSIC.utils.database import assistantdict
+
+    number = assistantdict.get(chat_id)
+    if number:
+        _floods.setdefault(int(number), deque(maxlen=64)).append(time.monotonic())
+
+
+def _recent_floods(number: int) -> int:
+    cutoff = time.monotonic() - PLACEMENT_FLOOD_WINDOW
+    return sum(1 for ts in _floods.get(number, ()) if ts >= cutoff)
+
+
+def _ping(number: int) -> float:
+    from ANNIEMUSIC.core.call import JARVIS
+
+    try:
+        return float(JARVIS.clients[number].ping or 0)
+    except Exception:
+        return 0.0
+
+
+def _score(st: Dict[str, float]) -> float:
+    return (
+        st["calls"] * PLACEMENT_W_CALL
+        + st["video"] * PLACEMENT_W_VIDEO
+        + st["floods"] * PLACEMENT_W_FLOOD
+        + st["ping"] * PLACEMENT_W_PING
+        + st["pinned"] * PLACEMENT_W_PINNED
+    )
+
+
+def snapshot() -> Dict[int, Dict[str, float]]:
+    """Per-assistant load signals and the score placement ranks them by."""
+    from ANNIEMUSIC.core.userbot import assistants
+    from ANNIEMUSIC.utils.database import active, activevideo, assistantdict
+
+    stats = {
+        n: {
+            "calls": 0,
+            "video": 0,
+            "pinned": 0,
+            "floods": _recent_floods(n),
+            "ping": _ping(n),
+        }
+        for n in assistants
+    }
+    live, video = set(active), set(activevideo)
+    for chat_id, number in assistantdict.items():
+        st = stats.get(number)
+        if st is None:
+            continue
+        st["pinned"] += 1
+        if chat_id in live:
+            st["calls"] += 1
+        if chat_id in video:
+            st["video"] += 1
+    for st in stats.values():
+        st["score"] = _score(st)
+    return stats
+
+
+def pick(exclude: Optional[int] = None) -> int:
+    """Least-loaded assistant; ties are broken at random."""
+    stats = snapshot()
+    candidates = [n for n in stats if n != exclude] or list(stats)
+    best = min(stats[n]["score"] for n in candidates)
+    return random.choice([n for n in candidates if stats[n]["score"] <= best + 1e-9])
+
+
+async def rebalance() -> int:
+    """
+    Re-pin chats that are not in a call from the hottest assistants to the
+    coolest ones. Chats in a call are never touched; a moved chat picks up
+    its new assistant the next time something is played there.
+    """
+    from ANNIEMUSIC.utils.database import active, assistantdict, set_assistant_new
+
+    stats = snapshot()
+    if len(stats) < 2:
+        return 0
+    live = set(active)
+    moved = 0
+    for chat_id, number in list(assistantdict.items()):
+        if moved >= REBALANCE_BATCH:
+            break
+        if chat_id in live or chat_id == config.LOGGER_ID or number not in stats:
+            continue
+        cool = min(stats, key=lambda n: stats[n]["score"])
+        if stats[number]["score"] - stats[cool]["score"] < REBALANCE_GAP:
+            continue
+        assistantdict[chat_id] = cool
+        await set_assistant_new(chat_id, cool)
+        for n, delta in ((number, -1), (cool, 1)):
+            stats[n]["pinned"] += delta
+            stats[n]["score"] = _score(stats[n])
+        moved += 1
+    return moved
+
+
+async def run() -> None:
+    global _moved
+    if REBALANCE_INTERVAL <= 0:
+        return
+    while True:
+        await asyncio.sleep(REBALANCE_INTERVAL)
+        try:
+            moved = await rebalance()
+        except Exception as e:
+            LOGGER(__name__).warning(f"Assistant rebalance failed: {e}")
+            continue
+        if moved:
+            _moved += moved
+            LOGGER(__name__).info(f"Rebalanced {moved} idle chats across assistants")
+
+
+def moved() -> int:
+    return _moved
@@ -0,0 +1,38 @@
+import asyncio
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, Union
+
+from ANNIEMUSIC import Spotify, YouTube
+from ANNIEMUSIC.utils.tuning import RESOLVE_FANOUT
+
+Details = Tuple[str, Optional[str], int, str, str]
+
+
+async def resolve_tracks(
+    queries: List[Union[str, Dict[str, Any]]],
+    fanout: int = RESOLVE_FANOUT,
+) -> AsyncIterator[Optional[Details]]:
+    """
+    Resolve playlist entries to YouTube details with up to ``fanout`` lookups
+    in flight, yielding results in playlist order as soon as each is ready.
+    Entries that cannot be resolved yield None. Breaking out early cancels
+    the lookups that are still pending.
+    """
+    sem = asyncio.Semaphore(max(1, fanout))
+
+    async def one(query: Union[str, Dict[str, Any]]) -> Optional[Details]:
+        async with sem:
+            try:
+                if isinstance(query, dict):
+                    # Spotify entries go through the persistent track map.
+                    return await Spotify.details(query)
+                return await YouTube.details(query)
+            except Exception:
+                return None
+
+    tasks = [asyncio.create_task(one(q)) for q in queries]
+    try:
+        for task in tasks:
+            yield await task
+    finally:
+        for task in tasks:
+            task.cancel()
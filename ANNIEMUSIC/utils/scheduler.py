@@ -0,0 +1,146 @@
+import asyncio
+import itertools
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional
+
+from ANNIEMUSIC.utils.tuning import MAX_CONCURRENT
+
+# Lower value runs first.
+NOW_PLAYING = 0
+NEXT_IN_QUEUE = 1
+SONG = 2
+PREFETCH = 3
+
+PRIORITY_NAMES = {
+    NOW_PLAYING: "now_playing",
+    NEXT_IN_QUEUE: "next_in_queue",
+    SONG: "song",
+    PREFETCH: "prefetch",
+}
+
+
+class _Waiter:
+    __slots__ = ("priority", "chat_id", "key", "seq", "future", "joined")
+
+    def __init__(self, priority: int, chat_id: Optional[int], key: Optional[str], seq: int):
+        self.priority = priority
+        self.chat_id = chat_id
+        self.key = key
+        self.seq = seq
+        self.joined = False
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+
+
+class DownloadScheduler:
+    """
+    Slot allocator for downloads with priority classes.
+
+    Waiters are served by priority first; within a class the chat holding
+    the fewest running slots goes first, then arrival order.
+    """
+
+    def __init__(self, slots: int) -> None:
+        self.slots = slots
+        self._running = 0
+        self._running_by_chat: Dict[Optional[int], int] = {}
+        self._waiting: List[_Waiter] = []
+        self._seq = itertools.count()
+        self.completed: Dict[int, int] = {p: 0 for p in PRIORITY_NAMES}
+        self.cancelled = 0
+
+    def _pick(self) -> Optional[_Waiter]:
+        if not self._waiting:
+            return None
+        return min(
+            self._waiting,
+            key=lambda w: (w.priority, self._running_by_chat.get(w.chat_id, 0), w.seq),
+        )
+
+    def _dispatch(self) -> None:
+        while self._running < self.slots:
+            waiter = self._pick()
+            if not waiter:
+                return
+            self._waiting.remove(waiter)
+            if waiter.future.done():
+                continue
+            self._take(waiter.chat_id)
+            waiter.future.set_result(True)
+
+    def _take(self, chat_id: Optional[int]) -> None:
+        self._running += 1
+        self._running_by_chat[chat_id] = self._running_by_chat.get(chat_id, 0) + 1
+
+    def _give_back(self, chat_id: Optional[int]) -> None:
+        self._running -= 1
+        left = self._running_by_chat.get(chat_id, 0) - 1
+        if left > 0:
+            self._running_by_chat[chat_id] = left
+        else:
+            self._running_by_chat.pop(chat_id, None)
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(
+        self,
+        priority: int = NOW_PLAYING,
+        chat_id: Optional[int] = None,
+        key: Optional[str] = None,
+    ):
+        if self._running < self.slots and not self._waiting:
+            self._take(chat_id)
+        else:
+            waiter = _Waiter(priority, chat_id, key, next(self._seq))
+            self._waiting.append(waiter)
+            try:
+                await waiter.future
+            except asyncio.CancelledError:
+                if waiter in self._waiting:
+                    self._waiting.remove(waiter)
+                elif waiter.future.done() and not waiter.future.cancelled():
+                    # Granted just before the cancel landed; pass it on.
+                    self._give_back(chat_id)
+                raise
+        try:
+            yield
+            self.completed[priority] = self.completed.get(priority, 0) + 1
+        finally:
+            self._give_back(chat_id)
+
+    def promote(self, key: str, priority: int) -> None:
+        """Another caller joined the download of ``key``; never run it later than they need."""
+        for waiter in self._waiting:
+            if waiter.key == key:
+                waiter.joined = True
+                if priority < waiter.priority:
+                    waiter.priority = priority
+
+    def cancel_chat(self, chat_id: int, below: int = NOW_PLAYING) -> int:
+        """
+        Cancel queued jobs of ``chat_id`` whose priority is lower than
+        ``below``. Jobs another caller has joined are left alone.
+        """
+        dropped = 0
+        for waiter in list(self._waiting):
+            if waiter.chat_id == chat_id and waiter.priority > below and not waiter.joined:
+                self._waiting.remove(waiter)
+                if not waiter.future.done():
+                    waiter.future.cancel()
+                dropped += 1
+        self.cancelled += dropped
+        return dropped
+
+    def stats(self) -> Dict[str, object]:
+        waiting: Dict[str, int] = {name: 0 for name in PRIORITY_NAMES.values()}
+        for waiter in self._waiting:
+            waiting[PRIORITY_NAMES.get(waiter.priority, str(waiter.priority))] += 1
+        return {
+            "slots": self.slots,
+            "running": self._running,
+            "waiting": waiting,
+            "completed": {PRIORITY_NAMES[p]: n for p, n in self.completed.items()},
+            "cancelled": self.cancelled,
+        }
+
+
+scheduler = DownloadScheduler(MAX_CONCURRENT)
@@ -0,0 +1,106 @@
+import asyncio
+from html.parser import HTMLParser
+from typing import Dict, List, Optional, Tuple
+
+import aiohttp
+from aiohttp import TCPConnector
+
+from ANNIEMUSIC.utils.meta_cache import MISS, TTLCache
+from ANNIEMUSIC.utils.tuning import CHUNK_SIZE, SCRAPE_CACHE_TTL, SCRAPE_MAX_HEAD
+
+Meta = List[Tuple[str, str]]
+
+# Parsing more than this inline would hold the loop for noticeable time.
+_INLINE_PARSE_LIMIT = 64 * 1024
+_HEADERS = {"User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36"}
+
+_session: Optional[aiohttp.ClientSession] = None
+_session_lock = asyncio.Lock()
+_pages = TTLCache(1024, SCRAPE_CACHE_TTL, 60)
+_inflight: Dict[str, asyncio.Task] = {}
+
+
+class _MetaParser(HTMLParser):
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.meta: Meta = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag != "meta":
+            return
+        a = dict(attrs)
+        key = a.get("property") or a.get("name")
+        if key and a.get("content") is not None:
+            self.meta.append((key, a["content"]))
+
+
+def _parse(head: str) -> Meta:
+    parser = _MetaParser()
+    parser.feed(head)
+    parser.close()
+    return parser.meta
+
+
+async def _get_session() -> aiohttp.ClientSession:
+    global _session
+    if _session and not _session.closed:
+        return _session
+    async with _session_lock:
+        if _session and not _session.closed:
+            return _session
+        timeout = aiohttp.ClientTimeout(total=20, sock_connect=10, sock_read=15)
+        connector = TCPConnector(limit=32, ttl_dns_cache=300, enable_cleanup_closed=True)
+        _session = aiohttp.ClientSession(timeout=timeout, connector=connector, headers=_HEADERS)
+        return _session
+
+
+async def _read_head(url: str) -> Optional[str]:
+    session = await _get_session()
+    async with session.get(url) as resp:
+        if resp.status != 200:
+            return None
+        buf = bytearray()
+        async for chunk in resp.content.iter_chunked(CHUNK_SIZE):
+            buf += chunk
+            # Everything we read lives in <head>; leave the body on the wire.
+            end = buf.lower().find(b"</head>", max(0, len(buf) - len(chunk) - 7))
+            if end != -1:
+                del buf[end:]
+                break
+            if len(buf) >= SCRAPE_MAX_HEAD:
+                break
+        return buf.decode(resp.charset or "utf-8", errors="replace")
+
+
+async def _fetch(url: str) -> Optional[Meta]:
+    head = await _read_head(url)
+    if head is None:
+        return None
+    if len(head) > _INLINE_PARSE_LIMIT:
+        return await asyncio.to_thread(_parse, head)
+    return _parse(head)
+
+
+async def page_meta(url: str) -> Optional[Meta]:
+    """``(property or name, content)`` pairs from a page's ``<head>``, cached by URL."""
+    cached = _pages.get(url)
+    if cached is not MISS:
+        return cached
+    task = _inflight.get(url)
+    if not task:
+        task = asyncio.create_task(_fetch(url))
+        _inflight[url] = task
+        task.add_done_callback(lambda _: _inflight.pop(url, None))
+    try:
+        meta = await asyncio.shield(task)
+    except (aiohttp.ClientError, asyncio.TimeoutError):
+        return None
+    _pages.set(url, meta)
+    return meta
+
+
+def first(meta: Optional[Meta], key: str) -> Optional[str]:
+    for k, v in meta or []:
+        if k == key:
+            return v
+    return None
@@ -1,14 +1,21 @@
 import os
 
 from config import autoclean
+from ANNIEMUSIC.utils.media_cache import media_cache
 
 
 async def auto_clean(popped):
+    try:
+        # The file a vid_ entry was played from (see core.call._hold).
+        media_cache.release(popped.get("held"))
+    except:
+        pass
     try:
         rem = popped["file"]
         autoclean.remove(rem)
+        media_cache.release(rem)
         count = autoclean.count(rem)
-        if count == 0:
+        if count == 0 and not media_cache.is_managed(rem):
             if "vid_" not in rem or "live_" not in rem or "index_" not in rem:
                 try:
                     os.remove(rem)
@@ -0,0 +1,107 @@
+import asyncio
+import contextlib
+import os
+from typing import Dict, Optional
+
+from ANNIEMUSIC import LOGGER, YouTube
+from ANNIEMUSIC.misc import db
+from ANNIEMUSIC.utils.downloader import file_exists
+from ANNIEMUSIC.utils.media_cache import media_cache
+from ANNIEMUSIC.utils.scheduler import PREFETCH, scheduler
+from ANNIEMUSIC.utils.tuning import PREFETCH_AHEAD, PREFETCH_CONCURRENCY
+
+_tasks: Dict[int, Dict[str, asyncio.Task]] = {}
+_held: Dict[int, Dict[str, str]] = {}
+_sem = asyncio.Semaphore(PREFETCH_CONCURRENCY)
+
+
+def _entry_key(entry: dict) -> str:
+    return f"{entry.get('vidid')}:{entry.get('streamtype')}"
+
+
+def _upcoming(chat_id: int) -> Dict[str, dict]:
+    wanted: Dict[str, dict] = {}
+    for entry in (db.get(chat_id) or [])[1 : 1 + PREFETCH_AHEAD]:
+        if "vid_" in str(entry.get("file", "")):
+            wanted[_entry_key(entry)] = entry
+    return wanted
+
+
+async def _fetch(chat_id: int, key: str, entry: dict) -> None:
+    async with _sem:
+        file_path, direct = await YouTube.download(
+            entry["vidid"],
+            None,
+            videoid=True,
+            video=str(entry.get("streamtype")) == "video",
+            priority=PREFETCH,
+            chat_id=chat_id,
+        )
+    if file_path and direct and key in _tasks.get(chat_id, {}):
+        media_cache.acquire(file_path)
+        _held.setdefault(chat_id, {})[key] = file_path
+        LOGGER(__name__).info(f"Prefetched {entry['vidid']} for {chat_id}")
+        _arm(chat_id)
+
+
+def _arm(chat_id: int) -> None:
+    from ANNIEMUSIC.core.call import arm
+
+    arm(chat_id)
+
+
+def ready_path(chat_id: int, entry: dict) -> Optional[str]:
+    """Downloaded file for a ``vid_`` entry, without starting a download."""
+    path = _held.get(chat_id, {}).get(_entry_key(entry))
+    if path and os.path.exists(path):
+        return path
+    fmt = "video" if str(entry.get("streamtype")) == "video" else "audio"
+    return file_exists(entry["vidid"], fmt)
+
+
+def _drop(chat_id: int, key: str) -> None:
+    task = _tasks.get(chat_id, {}).pop(key, None)
+    if task and not task.done():
+        task.cancel()
+    path = _held.get(chat_id, {}).pop(key, None)
+    if path:
+        media_cache.release(path)
+
+
+def refresh(chat_id: int) -> None:
+    """Align background downloads with the next PREFETCH_AHEAD queue entries."""
+    if PREFETCH_AHEAD <= 0:
+        _arm(chat_id)
+        return
+    wanted = _upcoming(chat_id)
+    queue = db.get(chat_id) or []
+    # The head is being started right now; let its download finish.
+    current = _entry_key(queue[0]) if queue else None
+    running = _tasks.setdefault(chat_id, {})
+    for key in list(running.keys()):
+        if key not in wanted and key != current:
+            _drop(chat_id, key)
+    for key, entry in wanted.items():
+        if key in running:
+            continue
+        task = asyncio.create_task(_fetch(chat_id, key, entry))
+        task.add_done_callback(_log_failure)
+        running[key] = task
+    _arm(chat_id)
+
+
+def cancel(chat_id: int) -> None:
+    scheduler.cancel_chat(chat_id)
+    for key in list(_tasks.get(chat_id, {}).keys()):
+        _drop(chat_id, key)
+    for key in list(_held.get(chat_id, {}).keys()):
+        _drop(chat_id, key)
+    _tasks.pop(chat_id, None)
+    _held.pop(chat_id, None)
+
+
+def _log_failure(task: asyncio.Task) -> None:
+    with contextlib.suppress(asyncio.CancelledError):
+        err = task.exception()
+        if err:
+            LOGGER(__name__).warning(f"Prefetch failed: {err}")
@@ -0,0 +1,288 @@
+import asyncio
+import contextlib
+import os
+import secrets
+from typing import Dict, Optional, Tuple
+
+import aiofiles
+from aiohttp import web
+
+from ANNIEMUSIC.logging import LOGGER
+from ANNIEMUSIC.misc import db
+from ANNIEMUSIC.utils.database import is_on_off
+from ANNIEMUSIC.utils.downloader import (
+    download_progress,
+    extract_video_id,
+    file_exists,
+    yt_dlp_download,
+)
+from ANNIEMUSIC.utils.scheduler import NOW_PLAYING
+from ANNIEMUSIC.utils.tuning import (
+    CHUNK_SIZE,
+    PROGRESSIVE_BUFFER,
+    PROGRESSIVE_MIN_DURATION,
+    PROGRESSIVE_START_TIMEOUT,
+    PROGRESSIVE_STALL_TIMEOUT,
+)
+
+_POLL = 0.25
+_GRACE = 300
+
+_jobs: Dict[str, "_Job"] = {}
+_runner: Optional[web.AppRunner] = None
+_base_url: Optional[str] = None
+_server_lock = asyncio.Lock()
+
+
+class _Job:
+    def __init__(
+        self,
+        vid: str,
+        task: asyncio.Task,
+        tmp: str,
+        final: str,
+        link: str,
+        video: bool,
+        duration: int,
+        chat_id: Optional[int],
+    ) -> None:
+        self.vid = vid
+        self.task = task
+        self.tmp = tmp
+        self.final = final
+        self.link = link
+        self.video = video
+        self.duration = duration
+        self.chat_id = chat_id
+        self.token = secrets.token_urlsafe(12)
+        self.sent = 0
+        self.finished = False
+        self.recovery: Optional[asyncio.Task] = None
+
+    def source(self) -> Optional[str]:
+        # yt-dlp renames the .part file on completion; an already open
+        # handle keeps reading the same inode either way.
+        for path in (self.tmp, self.final):
+            if path and os.path.exists(path):
+                return path
+        return None
+
+    def failed(self) -> bool:
+        if not self.task.done():
+            return False
+        return self.task.cancelled() or self.task.exception() is not None or not self.task.result()
+
+    async def completed(self) -> Optional[str]:
+        """
+        Path of the finished file. A failed download is started again once,
+        shared by everyone waiting on it; yt-dlp resumes from the .part.
+        """
+        with contextlib.suppress(Exception):
+            path = await asyncio.shield(self.task)
+            if path:
+                return path
+        if self.recovery is None:
+            LOGGER(__name__).warning(f"Progressive download of {self.vid} failed, retrying")
+            self.recovery = asyncio.create_task(
+                yt_dlp_download(
+                    self.link,
+                    type="video" if self.video else "audio",
+                    priority=NOW_PLAYING,
+                    chat_id=self.chat_id,
+                )
+            )
+        with contextlib.suppress(Exception):
+            return await asyncio.shield(self.recovery)
+        return None
+
+
+def _expire(job: _Job) -> None:
+    # Keep the URL valid for a while after completion: the call may still be
+    # probing or reconnecting when the last bytes land. A track still on air
+    # keeps its job so resume() can find it.
+    asyncio.get_running_loop().call_later(_GRACE, _drop, job)
+
+
+def _drop(job: _Job) -> None:
+    queue = db.get(job.chat_id) or []
+    playing = queue and os.path.abspath(str(queue[0].get("file", ""))) == os.path.abspath(job.final)
+    if job.finished or not playing:
+        _jobs.pop(job.token, None)
+    else:
+        _expire(job)
+
+
+async def _tail(path: str, offset: int, job: _Job, resp: web.StreamResponse) -> None:
+    async with aiofiles.open(path, "rb") as f:
+        await f.seek(offset)
+        while True:
+            chunk = await f.read(CHUNK_SIZE)
+            if not chunk:
+                return
+            await resp.write(chunk)
+            offset += len(chunk)
+            job.sent = max(job.sent, offset)
+
+
+async def _pump(job: _Job, resp: web.StreamResponse) -> None:
+    """
+    Feed the growing file to the call. The response is only closed once the
+    whole track has been sent: a stall holds it open, and a failed download
+    is retried and the feed continues from the same offset.
+    """
+    path = job.source()
+    if not path:
+        return
+    loop = asyncio.get_running_loop()
+    idle_since = loop.time()
+    stalled = draining = False
+    offset = 0
+    async with aiofiles.open(path, "rb") as f:
+        while True:
+            chunk = await f.read(CHUNK_SIZE)
+            if chunk:
+                await resp.write(chunk)
+                offset += len(chunk)
+                job.sent = max(job.sent, offset)
+                idle_since = loop.time()
+                stalled = False
+                continue
+            if job.task.done() and not job.failed():
+                # One more pass picks up bytes flushed just before completion.
+                if draining:
+                    job.finished = True
+                    return
+                draining = True
+                continue
+            if job.task.done():
+                break
+            if not stalled and loop.time() - idle_since > PROGRESSIVE_STALL_TIMEOUT:
+                stalled = True
+                LOGGER(__name__).warning(
+                    f"Progressive download of {job.vid} stalled, holding until it completes"
+                )
+            await asyncio.sleep(_POLL)
+    path = await job.completed()
+    if not path:
+        LOGGER(__name__).warning(f"Progressive download of {job.vid} gave up")
+        job.finished = True
+        return
+    await _tail(path, offset, job, resp)
+    job.finished = True
+
+
+async def resume(chat_id: int, queued: str) -> Optional[Tuple[str, int]]:
+    """
+    ``(path, seconds)`` to re-play from when the call's feed of the current
+    progressive track ended before the track did, e.g. on a dropped
+    connection. Waits for (or retries) the download. None when the track
+    was fully sent and the queue should move on.
+    """
+    queued = os.path.abspath(str(queued or ""))
+    job = next(
+        (
+            j
+            for j in list(_jobs.values())
+            if j.chat_id == chat_id and not j.finished and os.path.abspath(j.final) == queued
+        ),
+        None,
+    )
+    if not job:
+        return None
+    job.finished = True
+    path = await job.completed()
+    if not path:
+        return None
+    size = os.path.getsize(path)
+    if not size or job.sent >= size:
+        return None
+    return path, int(job.sent / size * job.duration)
+
+
+async def _serve(request: web.Request) -> web.StreamResponse:
+    job = _jobs.get(request.match_info["token"])
+    if not job:
+        raise web.HTTPNotFound()
+    resp = web.StreamResponse(headers={"Content-Type": "application/octet-stream"})
+    await resp.prepare(request)
+    try:
+        await _pump(job, resp)
+        await resp.write_eof()
+    except ConnectionResetError:
+        pass
+    return resp
+
+
+async def _ensure_server() -> str:
+    global _runner, _base_url
+    if _base_url:
+        return _base_url
+    async with _server_lock:
+        if _base_url:
+            return _base_url
+        app = web.Application()
+        app.router.add_get("/p/{token}", _serve)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = runner.addresses[0][1]
+        _runner = runner
+        _base_url = f"http://127.0.0.1:{port}/p/"
+        LOGGER(__name__).info(f"Progressive stream server listening on port {port}")
+        return _base_url
+
+
+def _buffered_seconds(vid: str, duration: int) -> float:
+    prog = download_progress(vid)
+    if not prog or not prog.get("total"):
+        return 0.0
+    return prog["downloaded"] / prog["total"] * duration
+
+
+async def start(
+    link: str, duration: int, video: bool = False, chat_id: Optional[int] = None
+) -> Optional[Tuple[str, str]]:
+    """
+    Begin a download and hand back ``(play_url, final_path)`` as soon as
+    PROGRESSIVE_BUFFER seconds are on disk. Returns None when the track is
+    short, finishes quickly, or buffering does not start in time; callers
+    then wait for the completed file as usual, sharing the same download.
+    """
+    if PROGRESSIVE_MIN_DURATION <= 0 or not duration or duration < PROGRESSIVE_MIN_DURATION:
+        return None
+    if video and not await is_on_off(1):
+        return None
+
+    vid = extract_video_id(link)
+    if file_exists(vid, "video" if video else "audio"):
+        return None
+    task = asyncio.create_task(
+        yt_dlp_download(
+            link,
+            type="video" if video else "audio",
+            priority=NOW_PLAYING,
+            chat_id=chat_id,
+        )
+    )
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + PROGRESSIVE_START_TIMEOUT
+    while not task.done():
+        if _buffered_seconds(vid, duration) >= PROGRESSIVE_BUFFER:
+            break
+        if loop.time() > deadline:
+            return None
+        await asyncio.sleep(_POLL)
+    prog = download_progress(vid)
+    if task.done() or not prog or not prog.get("final"):
+        return None
+
+    try:
+        base = await _ensure_server()
+    except OSError as e:
+        LOGGER(__name__).warning(f"Progressive stream server unavailable: {e}")
+        return None
+    job = _Job(vid, task, prog["tmp"], prog["final"], link, video, duration, chat_id)
+    _jobs[job.token] = job
+    task.add_done_callback(lambda _: _expire(job))
+    return base + job.token, os.path.abspath(prog["final"])
@@ -3,6 +3,8 @@ from typing import Union
 
 from ANNIEMUSIC.misc import db
 from ANNIEMUSIC.utils.formatters import check_duration, seconds_to_min
+from ANNIEMUSIC.utils.media_cache import media_cache
+from ANNIEMUSIC.utils.stream import prefetch
 from config import autoclean, time_to_seconds
 
 
@@ -45,6 +47,8 @@ async def put_queue(
     else:
         db[chat_id].append(put)
     autoclean.append(file)
+    media_cache.acquire(file)
+    prefetch.refresh(chat_id)
 
 
 async def put_queue_index(
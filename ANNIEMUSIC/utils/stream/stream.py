@@ -1,49 +1,100 @@
+import asyncio
 import os
 from random import randint
-from typing import Union
+from typing import AsyncIterator, Union
 
 from pyrogram.types import InlineKeyboardMarkup
 
 import config
-from ANNIEMUSIC import Carbon, YouTube, app
+from ANNIEMUSIC import LOGGER, Carbon, Spotify, YouTube, app
 from ANNIEMUSIC.core.call import JARVIS
 from ANNIEMUSIC.misc import db
 from ANNIEMUSIC.utils.database import add_active_video_chat, is_active_chat
 from ANNIEMUSIC.utils.exceptions import AssistantErr
+from ANNIEMUSIC.utils.formatters import time_to_seconds
 from ANNIEMUSIC.utils.inline import aq_markup, close_markup, stream_markup
 from ANNIEMUSIC.utils.pastebin import ANNIEBIN
+from ANNIEMUSIC.utils.resolver import resolve_tracks
+from ANNIEMUSIC.utils.scheduler import NEXT_IN_QUEUE, NOW_PLAYING
+from ANNIEMUSIC.utils.stream import progressive
 from ANNIEMUSIC.utils.stream.queue import put_queue, put_queue_index
 from ANNIEMUSIC.utils.thumbnails import get_thumb
 from ANNIEMUSIC.utils.errors import capture_internal_err
-from ANNIEMUSIC.platforms.Spotify import SpotifyAPI
 
-spotify = SpotifyAPI()
+log = LOGGER(__name__)
+
+
+async def _playlist_summary(_, original_chat_id, msg: str, position: int) -> None:
+    link = await ANNIEBIN(msg)
+    lines = msg.count("\n")
+    car = os.linesep.join(msg.split(os.linesep)[:17]) if lines >= 17 else msg
+    carbon = await Carbon.generate(car, randint(100, 10000000))
+    await app.send_photo(
+        original_chat_id,
+        photo=carbon,
+        caption=_["play_21"].format(position, link),
+        reply_markup=close_markup(_),
+    )
 
-import asyncio
 
-async def delete_after_playback(file_path: str, duration: str):
-    """Delete the file safely after the track finishes."""
+async def _playable(result) -> AsyncIterator[dict]:
+    """Flat playlist entries within the duration limit, list or async iterator."""
+    if not hasattr(result, "__aiter__"):
+        result = _from_list(result)
+    count = 0
     try:
-        # Convert duration (mm:ss) → total seconds
-        if duration and ":" in duration:
-            parts = duration.split(":")
-            seconds = int(parts[0]) * 60 + int(parts[1])
-        else:
-            seconds = 0  # skip live tracks or unknown durations
+        async for e in result:
+            if count >= config.PLAYLIST_FETCH_LIMIT:
+                break
+            if e["duration_min"] and e["duration_sec"] <= config.DURATION_LIMIT:
+                count += 1
+                yield e
+    finally:
+        await result.aclose()
 
-        # Wait for the song to complete (+ buffer)
-        await asyncio.sleep(seconds + 30)
 
-        # Delete the file if it exists
-        if os.path.exists(file_path):
-            os.remove(file_path)
-            print(f"[CLEANUP] Deleted file after playback: {file_path}")
-        else:
-            print(f"[CLEANUP] File not found (already removed?): {file_path}")
+async def _from_list(entries) -> AsyncIterator[dict]:
+    for e in entries:
+        yield e
 
-    except Exception as e:
-        print(f"[CLEANUP ERROR] Could not delete {file_path}: {e}")
 
+async def _enqueue_rest(
+    _, entries, chat_id, original_chat_id, user_name, user_id, streamtype
+) -> None:
+    """
+    Append flat playlist entries behind the track that is already playing,
+    consuming the iterator as the listing pages in. Each stays a ``vid_``
+    placeholder until prefetch or playback reaches it.
+    """
+    msg = f"{_['play_19']}\n\n"
+    count = 0
+    position = 0
+    try:
+        async for entry in entries:
+            if chat_id not in db or not await is_active_chat(chat_id):
+                break
+            await put_queue(
+                chat_id,
+                original_chat_id,
+                f"vid_{entry['vidid']}",
+                entry["title"],
+                entry["duration_min"],
+                user_name,
+                entry["vidid"],
+                user_id,
+                streamtype,
+            )
+            position = len(db.get(chat_id)) - 1
+            count += 1
+            msg += f"{count}. {entry['title'][:70]}\n"
+            msg += f"{_['play_20']} {position}\n\n"
+            await asyncio.sleep(0)
+        if count:
+            await _playlist_summary(_, original_chat_id, msg, position)
+    except Exception as e:
+        LOGGER(__name__).warning(f"Playlist enqueue for {chat_id} stopped: {e}")
+    finally:
+        await entries.aclose()
 
 
 @capture_internal_err
@@ -72,7 +123,7 @@ async def stream(
         """Search the song in Spotify if YouTube fails."""
         print(f"[FALLBACK] YouTube failed — trying Spotify for: {query}")
         try:
-            track_data, vidid = await spotify.search(query)
+            track_data, vidid = await Spotify.search(query)
             if not track_data:
                 print(f"[FALLBACK] No Spotify match found for {query}")
                 return None
@@ -98,7 +149,140 @@ async def stream(
             return None
 
     # ------------------------ 🎵 YouTube Stream ------------------------
-    if streamtype == "youtube":
+    if streamtype == "playlist" and not spotify:
+        # Flat YouTube entries: start the first one now and queue the rest
+        # in the background as the listing pages in, without resolving each
+        # video up front.
+        entries = _playable(result)
+        kind = "video" if is_video else "audio"
+        if not await is_active_chat(chat_id):
+            try:
+                first = await entries.__anext__()
+            except StopAsyncIteration:
+                return
+            try:
+                vidid, title = first["vidid"], first["title"]
+                if not forceplay:
+                    db[chat_id] = []
+                try:
+                    file_path, direct = await YouTube.download(
+                        vidid, mystic, video=is_video, videoid=vidid, chat_id=chat_id
+                    )
+                except Exception:
+                    raise AssistantErr(_["play_14"])
+                await JARVIS.join_call(
+                    chat_id, original_chat_id, file_path, video=is_video, image=first["thumb"]
+                )
+                await put_queue(
+                    chat_id,
+                    original_chat_id,
+                    file_path if direct else f"vid_{vidid}",
+                    title,
+                    first["duration_min"],
+                    user_name,
+                    vidid,
+                    user_id,
+                    kind,
+                    forceplay=forceplay,
+                )
+                img = await get_thumb(vidid)
+                button = stream_markup(_, chat_id)
+                run = await app.send_photo(
+                    original_chat_id,
+                    photo=img,
+                    caption=_["stream_1"].format(
+                        f"https://t.me/{app.username}?start=info_{vidid}",
+                        title[:23],
+                        first["duration_min"],
+                        user_name,
+                    ),
+                    reply_markup=InlineKeyboardMarkup(button),
+                )
+                db[chat_id][0]["mystic"] = run
+                db[chat_id][0]["markup"] = "stream"
+            except BaseException:
+                await entries.aclose()
+                raise
+        asyncio.create_task(
+            _enqueue_rest(
+                _, entries, chat_id, original_chat_id, user_name, user_id, kind
+            )
+        )
+        return
+
+    elif streamtype == "playlist":
+        msg = f"{_['play_19']}\n\n"
+        count = 0
+        position = 0
+        # Spotify hands over track entries, Apple "title artist" queries.
+        async for details in resolve_tracks(result):
+            if count == config.PLAYLIST_FETCH_LIMIT:
+                break
+            if not details:
+                continue
+            title, duration_min, duration_sec, thumbnail, vidid = details
+            if str(duration_min) == "None" or duration_sec > config.DURATION_LIMIT:
+                continue
+            if await is_active_chat(chat_id):
+                await put_queue(
+                    chat_id,
+                    original_chat_id,
+                    f"vid_{vidid}",
+                    title,
+                    duration_min,
+                    user_name,
+                    vidid,
+                    user_id,
+                    "video" if is_video else "audio",
+                )
+                position = len(db.get(chat_id)) - 1
+                count += 1
+                msg += f"{count}. {title[:70]}\n"
+                msg += f"{_['play_20']} {position}\n\n"
+            else:
+                if not forceplay:
+                    db[chat_id] = []
+                try:
+                    file_path, direct = await YouTube.download(
+                        vidid, mystic, video=is_video, videoid=vidid, chat_id=chat_id
+                    )
+                except Exception:
+                    raise AssistantErr(_["play_14"])
+                await JARVIS.join_call(
+                    chat_id, original_chat_id, file_path, video=is_video, image=thumbnail
+                )
+                await put_queue(
+                    chat_id,
+                    original_chat_id,
+                    file_path if direct else f"vid_{vidid}",
+                    title,
+                    duration_min,
+                    user_name,
+                    vidid,
+                    user_id,
+                    "video" if is_video else "audio",
+                    forceplay=forceplay,
+                )
+                img = await get_thumb(vidid)
+                button = stream_markup(_, chat_id)
+                run = await app.send_photo(
+                    original_chat_id,
+                    photo=img,
+                    caption=_["stream_1"].format(
+                        f"https://t.me/{app.username}?start=info_{vidid}",
+                        title[:23],
+                        duration_min,
+                        user_name,
+                    ),
+                    reply_markup=InlineKeyboardMarkup(button),
+                )
+                db[chat_id][0]["mystic"] = run
+                db[chat_id][0]["markup"] = "stream"
+        if count == 0:
+            return
+        return await _playlist_summary(_, original_chat_id, msg, position)
+
+    elif streamtype == "youtube":
         link = result["link"]
         vidid = result["vidid"]
         title = (result["title"]).title()
@@ -107,10 +291,29 @@ async def stream(
 
         print(f"[DEBUG] Attempting to stream YouTube track: {title}")
 
+        queued = await is_active_chat(chat_id)
+        play_path = None
         try:
-            file_path, direct = await YouTube.download(
-                vidid, mystic, video=is_video, videoid=vidid
-            )
+            if not queued and str(duration_min or "").replace(":", "").isdigit():
+                # Long tracks start on the partial download and keep filling.
+                started = await progressive.start(
+                    YouTube.base_url + vidid,
+                    time_to_seconds(duration_min),
+                    video=is_video,
+                    chat_id=chat_id,
+                )
+                if started:
+                    play_path, file_path = started
+                    direct = True
+            if not play_path:
+                file_path, direct = await YouTube.download(
+                    vidid,
+                    mystic,
+                    video=is_video,
+                    videoid=vidid,
+                    priority=NEXT_IN_QUEUE if queued else NOW_PLAYING,
+                    chat_id=chat_id,
+                )
         except Exception as e:
             print(f"[ERROR] YouTube download failed for {title}: {e}")
             print("[FALLBACK] Switching to Spotify...")
@@ -155,7 +358,7 @@ async def stream(
             await JARVIS.join_call(
                 chat_id,
                 original_chat_id,
-                file_path,
+                play_path or file_path,
                 video=is_video,
                 image=thumbnail,
             )
@@ -186,8 +389,6 @@ async def stream(
             )
             db[chat_id][0]["mystic"] = run
             db[chat_id][0]["markup"] = "stream"
-        # Schedule file deletion after playback
-            asyncio.create_task(delete_after_playback(file_path, duration_min))
 
     # ------------------------ 🎧 Spotify Stream ------------------------
     elif streamtype == "spotify":
@@ -195,7 +396,7 @@ async def stream(
         print(f"[DEBUG] Stream type: Spotify | Link: {link}")
 
         try:
-            track_details, vidid = await spotify.track(link)
+            track_details, vidid = await Spotify.track(link)
             print(f"[DEBUG] Spotify track details: {track_details}")
 
             title = track_details["title"]
@@ -204,7 +405,7 @@ async def stream(
             vidid = track_details["vidid"]
 
             # Download YouTube equivalent
-            file_path, direct = await YouTube.download(vidid, mystic)
+            file_path, direct = await YouTube.download(vidid, mystic, chat_id=chat_id)
 
             if not file_path:
                 raise AssistantErr(_["play_14"])
@@ -264,7 +465,6 @@ async def stream(
         except Exception as e:
             print("[DEBUG] Spotify error:", e)
             raise AssistantErr(_["play_14"])
-        asyncio.create_task(delete_after_playback(file_path, duration_min))
 
     # 🪄 Add the same logic to other sources (SoundCloud, Telegram, etc.)
     # if needed — only the YouTube block needed fallback to Spotify.
@@ -321,7 +521,6 @@ async def stream(
                 )
                 db[chat_id][0]["mystic"] = run
                 db[chat_id][0]["markup"] = "tg"
-                asyncio.create_task(delete_after_playback(file_path, duration_min))
 
     elif streamtype == "telegram":
             file_path = result["path"]
@@ -377,7 +576,6 @@ async def stream(
                 )
                 db[chat_id][0]["mystic"] = run
                 db[chat_id][0]["markup"] = "tg"
-                asyncio.create_task(delete_after_playback(file_path, duration_min))
 
 
     elif streamtype == "live":
@@ -430,7 +628,7 @@ async def stream(
                     else:
                         file_path = file_path[0]
 
-                if not file_path:
+                if n == 0 or not file_path:
                     log.error("[LIVE STREAM] No valid file_path returned.")
                     raise AssistantErr(_["play_14"])
 
@@ -482,7 +680,6 @@ async def stream(
                     db[chat_id][0]["mystic"] = run
                     db[chat_id][0]["markup"] = "tg"
                     log.info(f"[LIVE STREAM] Live stream started successfully: {title}")
-                    asyncio.create_task(delete_after_playback(file_path, duration_min))
                 except Exception as e:
                     log.exception(f"[LIVE STREAM] Error sending live stream photo: {e}")
                 
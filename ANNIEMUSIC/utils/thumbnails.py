@@ -3,9 +3,9 @@ import re
 import aiofiles
 import aiohttp
 from PIL import Image, ImageDraw, ImageEnhance, ImageFilter, ImageFont
-from youtubesearchpython.__future__ import VideosSearch
 from config import YOUTUBE_IMG_URL
 from ANNIEMUSIC.core.dir import CACHE_DIR 
+from ANNIEMUSIC.utils.meta_cache import youtube_search
 
 
 PANEL_W, PANEL_H = 763, 545
@@ -48,10 +48,8 @@ async def get_thumb(videoid: str) -> str:
         return cache_path
 
     # YouTube video data fetch
-    results = VideosSearch(f"https://www.youtube.com/watch?v={videoid}", limit=1)
     try:
-        results_data = await results.next()
-        result_items = results_data.get("result", [])
+        result_items = await youtube_search(f"https://www.youtube.com/watch?v={videoid}")
         if not result_items:
             raise ValueError("No results found.")
         data = result_items[0]
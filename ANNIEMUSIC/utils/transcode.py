@@ -0,0 +1,141 @@
+import asyncio
+import contextlib
+import json
+import os
+from typing import Dict, Optional
+
+from ANNIEMUSIC.core.dir import DOWNLOAD_DIR
+from ANNIEMUSIC.logging import LOGGER
+from ANNIEMUSIC.utils.media_cache import MediaCache, media_cache
+from ANNIEMUSIC.utils.tuning import (
+    NATIVE_CACHE_MAX_BYTES,
+    TRANSCODE_CONCURRENCY,
+    TRANSCODE_NATIVE,
+)
+
+NATIVE_DIR = os.path.join(DOWNLOAD_DIR, "native")
+
+# Targets match what the call pipeline feeds tgcalls: 48 kHz stereo audio and
+# VideoQuality.HD_720p frames, so playback skips resampling and scaling.
+_AUDIO_ARGS = ["-vn", "-c:a", "libopus", "-ar", "48000", "-ac", "2", "-b:a", "128k", "-f", "ogg"]
+_VIDEO_ARGS = [
+    "-vf", "scale=1280:720:force_original_aspect_ratio=decrease:force_divisible_by=2,pad=1280:720:-1:-1,fps=30",
+    "-c:v", "libx264", "-preset", "veryfast", "-crf", "23", "-pix_fmt", "yuv420p",
+    "-c:a", "libopus", "-ar", "48000", "-ac", "2", "-b:a", "128k",
+    "-f", "matroska",
+]
+
+native_cache = MediaCache(NATIVE_DIR, NATIVE_CACHE_MAX_BYTES)
+
+_tasks: Dict[str, asyncio.Task] = {}
+_sem = asyncio.Semaphore(TRANSCODE_CONCURRENCY)
+stats = {"done": 0, "skipped": 0, "failed": 0}
+
+
+def _fmt(video: bool) -> str:
+    return "video" if video else "audio"
+
+
+def _media_id(path: str) -> str:
+    return os.path.basename(path).rpartition(".")[0]
+
+
+def native_path(path: str, video: bool = False) -> str:
+    """The call-native artifact for ``path`` if one is ready, else ``path``."""
+    if not TRANSCODE_NATIVE or not media_cache.is_managed(path):
+        return path
+    return native_cache.lookup(_media_id(path), _fmt(video)) or path
+
+
+async def _probe(path: str) -> Optional[Dict]:
+    proc = await asyncio.create_subprocess_exec(
+        "ffprobe", "-v", "error", "-print_format", "json", "-show_streams", path,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.DEVNULL,
+    )
+    out, _ = await proc.communicate()
+    with contextlib.suppress(ValueError):
+        return json.loads(out or b"{}")
+    return None
+
+
+def _already_native(probe: Dict, video: bool) -> bool:
+    streams = probe.get("streams") or []
+    audio = next((s for s in streams if s.get("codec_type") == "audio"), None)
+    vstream = next((s for s in streams if s.get("codec_type") == "video"), None)
+    audio_ok = bool(audio) and audio.get("codec_name") == "opus" and str(
+        audio.get("sample_rate")
+    ) == "48000"
+    if not video:
+        return audio_ok
+    return (
+        audio_ok
+        and bool(vstream)
+        and vstream.get("codec_name") == "h264"
+        and vstream.get("width") == 1280
+        and vstream.get("height") == 720
+    )
+
+
+async def _transcode(path: str, video: bool) -> Optional[str]:
+    async with _sem:
+        probe = await _probe(path)
+        if probe is None:
+            stats["failed"] += 1
+            return None
+        if _already_native(probe, video):
+            stats["skipped"] += 1
+            return None
+        ext = "mkv" if video else "ogg"
+        out = os.path.join(NATIVE_DIR, f"{_media_id(path)}.{ext}")
+        tmp = out + ".tmp"
+        proc = await asyncio.create_subprocess_exec(
+            "ffmpeg", "-nostdin", "-y", "-loglevel", "error", "-i", path,
+            *(_VIDEO_ARGS if video else _AUDIO_ARGS), tmp,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        try:
+            _, err = await proc.communicate()
+        except asyncio.CancelledError:
+            with contextlib.suppress(ProcessLookupError):
+                proc.kill()
+            with contextlib.suppress(OSError):
+                os.remove(tmp)
+            raise
+        if proc.returncode != 0:
+            stats["failed"] += 1
+            with contextlib.suppress(OSError):
+                os.remove(tmp)
+            LOGGER(__name__).warning(
+                f"Transcode of {path} failed: {err.decode(errors='ignore').strip()[-200:]}"
+            )
+            return None
+        os.replace(tmp, out)
+        stats["done"] += 1
+        return native_cache.add(out, _fmt(video))
+
+
+def submit(path: Optional[str], video: bool = False) -> None:
+    """Queue a background transcode of a freshly downloaded file."""
+    if not TRANSCODE_NATIVE or not path or not os.path.isfile(path):
+        return
+    key = native_cache.key(_media_id(path), _fmt(video))
+    if key in _tasks or native_cache.lookup(_media_id(path), _fmt(video)):
+        return
+    task = asyncio.create_task(_transcode(path, video))
+    _tasks[key] = task
+    task.add_done_callback(lambda t: _finished(key, t))
+
+
+def _finished(key: str, task: asyncio.Task) -> None:
+    _tasks.pop(key, None)
+    with contextlib.suppress(asyncio.CancelledError):
+        err = task.exception()
+        if err:
+            stats["failed"] += 1
+            LOGGER(__name__).warning(f"Transcode task failed: {err}")
+
+
+def snapshot() -> Dict[str, int]:
+    return {**stats, "pending": len(_tasks), **native_cache.stats()}
@@ -1,13 +1,78 @@
 import os
-import asyncio
 
 CPU = os.cpu_count() or 4
 
 MAX_CONCURRENT = int(os.getenv("MAX_CONCURRENT", str(min(64, CPU * 8))))
+YTDLP_WORKERS = int(os.getenv("YTDLP_WORKERS", str(min(32, CPU * 4))))
 CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", str(64 * 1024)))
 
 YTDLP_TIMEOUT = int(os.getenv("YTDLP_TIMEOUT", "45"))
 YOUTUBE_META_TTL = int(os.getenv("YOUTUBE_META_TTL", "300"))
 YOUTUBE_META_MAX = int(os.getenv("YOUTUBE_META_MAX", "2048"))
+YOUTUBE_META_NEG_TTL = int(os.getenv("YOUTUBE_META_NEG_TTL", "60"))
+YTDLP_INFO_TTL = int(os.getenv("YTDLP_INFO_TTL", "300"))
+YTDLP_INFO_MAX = int(os.getenv("YTDLP_INFO_MAX", "256"))
 
-SEM = asyncio.Semaphore(MAX_CONCURRENT)
\ No newline at end of file
+API_POLL_MIN = float(os.getenv("API_POLL_MIN", "0.25"))
+API_POLL_MAX = float(os.getenv("API_POLL_MAX", "4"))
+API_DEADLINE = float(os.getenv("API_DEADLINE", "90"))
+
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "90"))
+HEDGE_MIN_DELAY = float(os.getenv("HEDGE_MIN_DELAY", "0.5"))
+HEDGE_MAX_DELAY = float(os.getenv("HEDGE_MAX_DELAY", "6"))
+# Share of downloads that start on the lower-ranked backend, so it is re-measured.
+HEDGE_PROBE_RATE = float(os.getenv("HEDGE_PROBE_RATE", "0.05"))
+
+PREFETCH_AHEAD = int(os.getenv("PREFETCH_AHEAD", "2"))
+PREFETCH_CONCURRENCY = int(os.getenv("PREFETCH_CONCURRENCY", str(max(2, CPU // 2))))
+MEDIA_CACHE_MAX_BYTES = int(os.getenv("MEDIA_CACHE_MAX_BYTES", str(5 * 1024**3)))
+MEDIA_CACHE_FLUSH_DELAY = float(os.getenv("MEDIA_CACHE_FLUSH_DELAY", "5"))
+PROGRESSIVE_MIN_DURATION = int(os.getenv("PROGRESSIVE_MIN_DURATION", "900"))
+PROGRESSIVE_BUFFER = float(os.getenv("PROGRESSIVE_BUFFER", "30"))
+PROGRESSIVE_START_TIMEOUT = float(os.getenv("PROGRESSIVE_START_TIMEOUT", "20"))
+PROGRESSIVE_STALL_TIMEOUT = float(os.getenv("PROGRESSIVE_STALL_TIMEOUT", "30"))
+
+TRANSCODE_NATIVE = os.getenv("TRANSCODE_NATIVE", "false").lower() in ("1", "true", "yes")
+TRANSCODE_CONCURRENCY = int(os.getenv("TRANSCODE_CONCURRENCY", str(max(1, CPU // 4))))
+NATIVE_CACHE_MAX_BYTES = int(os.getenv("NATIVE_CACHE_MAX_BYTES", str(3 * 1024**3)))
+
+JANITOR_INTERVAL = int(os.getenv("JANITOR_INTERVAL", "600"))
+JANITOR_GRACE = int(os.getenv("JANITOR_GRACE", "120"))
+DOWNLOADS_STRAY_MAX_AGE = int(os.getenv("DOWNLOADS_STRAY_MAX_AGE", str(6 * 3600)))
+CACHE_DIR_MAX_BYTES = int(os.getenv("CACHE_DIR_MAX_BYTES", str(512 * 1024**2)))
+CACHE_DIR_MAX_AGE = int(os.getenv("CACHE_DIR_MAX_AGE", str(7 * 86400)))
+PLAYBACK_MAX_BYTES = int(os.getenv("PLAYBACK_MAX_BYTES", str(1024**3)))
+PLAYBACK_MAX_AGE = int(os.getenv("PLAYBACK_MAX_AGE", str(6 * 3600)))
+COUPLES_MAX_BYTES = int(os.getenv("COUPLES_MAX_BYTES", str(128 * 1024**2)))
+COUPLES_MAX_AGE = int(os.getenv("COUPLES_MAX_AGE", str(2 * 86400)))
+
+TRACK_STORE_TTL = int(os.getenv("TRACK_STORE_TTL", str(30 * 86400)))
+TRACK_QUERY_TTL = int(os.getenv("TRACK_QUERY_TTL", str(7 * 86400)))
+
+RESOLVE_FANOUT = int(os.getenv("RESOLVE_FANOUT", "8"))
+
+SPOTIFY_CACHE_TTL = int(os.getenv("SPOTIFY_CACHE_TTL", "600"))
+SPOTIFY_CACHE_MAX = int(os.getenv("SPOTIFY_CACHE_MAX", "512"))
+SPOTIFY_MAP_TTL = int(os.getenv("SPOTIFY_MAP_TTL", str(30 * 86400)))
+
+SCRAPE_CACHE_TTL = int(os.getenv("SCRAPE_CACHE_TTL", "3600"))
+SCRAPE_MAX_HEAD = int(os.getenv("SCRAPE_MAX_HEAD", str(1024 * 1024)))
+
+INLINE_DEBOUNCE = float(os.getenv("INLINE_DEBOUNCE", "0.4"))
+INLINE_CACHE_TIME = int(os.getenv("INLINE_CACHE_TIME", "300"))
+INLINE_MIN_PREFIX = int(os.getenv("INLINE_MIN_PREFIX", "3"))
+
+LIVE_URL_MARGIN = int(os.getenv("LIVE_URL_MARGIN", "300"))
+LIVE_URL_FALLBACK_TTL = int(os.getenv("LIVE_URL_FALLBACK_TTL", "1800"))
+
+# Assistant placement: load score weights per active call, extra per video
+# stream, per FloodWait inside the window, per ms of ping, per pinned chat.
+PLACEMENT_W_CALL = float(os.getenv("PLACEMENT_W_CALL", "1.0"))
+PLACEMENT_W_VIDEO = float(os.getenv("PLACEMENT_W_VIDEO", "1.5"))
+PLACEMENT_W_FLOOD = float(os.getenv("PLACEMENT_W_FLOOD", "2.0"))
+PLACEMENT_W_PING = float(os.getenv("PLACEMENT_W_PING", "0.01"))
+PLACEMENT_W_PINNED = float(os.getenv("PLACEMENT_W_PINNED", "0.05"))
+PLACEMENT_FLOOD_WINDOW = int(os.getenv("PLACEMENT_FLOOD_WINDOW", "900"))
+REBALANCE_INTERVAL = int(os.getenv("REBALANCE_INTERVAL", "0"))
+REBALANCE_GAP = float(os.getenv("REBALANCE_GAP", "2.0"))
+REBALANCE_BATCH = int(os.getenv("REBALANCE_BATCH", "20"))
@@ -1,5 +1,5 @@
 import re
-from os import getenv
+from os import environ, getenv
 from dotenv import load_dotenv
 from pyrogram import filters
 
@@ -52,6 +52,15 @@ SUPPORT_CHAT = getenv("SUPPORT_CHAT", "https://t.me/CertifiedDiscussion")
 AUTO_LEAVING_ASSISTANT = False
 AUTO_LEAVE_ASSISTANT_TIME = int(getenv("ASSISTANT_LEAVE_TIME", "3600"))
 
+# ── Plugins ────────────────────────────────────────────────────────────────────
+# Comma separated plugin groups ("Kishu,tools,misc") or single modules
+# ("tools.tiny") that are not loaded at all.
+DISABLED_PLUGINS = {
+    name.strip().lower() for name in getenv("DISABLED_PLUGINS", "").split(",") if name.strip()
+}
+# Import heavy command-only plugins on their first command instead of at boot.
+LAZY_PLUGINS = getenv("LAZY_PLUGINS", "True").lower() in ("true", "1", "yes")
+
 # ── Debug ──────────────────────────────────────────────────────────────────────
 DEBUG_IGNORE_LOG = True
 
@@ -66,6 +75,25 @@ STRING3 = getenv("STRING_SESSION3")
 STRING4 = getenv("STRING_SESSION4")
 STRING5 = getenv("STRING_SESSION5")
 
+# Assistant number -> session; STRING_SESSION6, STRING_SESSION7, ... add more.
+# The unnumbered STRING_SESSION is assistant 1 unless STRING_SESSION1 is also
+# set, in which case it takes the next free number. A session string listed
+# twice is only started once.
+STRING_SESSIONS = {}
+for _key, _value in sorted(
+    ((key, value) for key, value in environ.items() if re.fullmatch(r"STRING_SESSION\d+", key)),
+    key=lambda item: int(item[0][len("STRING_SESSION"):]),
+):
+    if _value and _value not in STRING_SESSIONS.values():
+        STRING_SESSIONS[int(_key[len("STRING_SESSION"):])] = _value
+if STRING1 and STRING1 not in STRING_SESSIONS.values():
+    _number = 1
+    while _number in STRING_SESSIONS:
+        _number += 1
+    STRING_SESSIONS[_number] = STRING1
+STRING_SESSIONS = dict(sorted(STRING_SESSIONS.items()))
+ASSISTANT_START_TIMEOUT = int(getenv("ASSISTANT_START_TIMEOUT", 60))
+
 # ── Media assets ───────────────────────────────────────────────────────────────
 START_VIDS = [
     "https://telegra.ph/file/9b7e1b820c72a14d90be7.mp4",